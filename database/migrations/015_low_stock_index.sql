@@ -0,0 +1,16 @@
+-- Migration 015: Index for the per-warehouse low-stock count
+-- Run this in Supabase SQL editor
+--
+-- GET /api/inventory/{warehouse_id} counts rows matching
+--   warehouse_id = ? AND quantity_on_hand < 5
+-- on every page load. A partial index keeps only the low-stock rows, so the
+-- count becomes an index-only scan over a small prefix instead of filtering
+-- every inventory row for the warehouse.
+--
+-- This index is the only low-stock mechanism: the counter table added in
+-- migration 016 was dropped again in 033 so the two don't both add write
+-- cost. Keep it in step with the threshold used by the endpoint (< 5).
+
+CREATE INDEX IF NOT EXISTS idx_inventory_low_stock
+ON public.inventory_items(warehouse_id, quantity_on_hand)
+WHERE quantity_on_hand < 5;
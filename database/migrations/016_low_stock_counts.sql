@@ -0,0 +1,76 @@
+-- Migration 016: Trigger-maintained low-stock counter per warehouse
+-- Run this in Supabase SQL editor
+--
+-- The warehouse inventory endpoint showed low_stock_count by running a HEAD
+-- count over inventory_items on every pagination click. Keep the count in a
+-- one-row-per-warehouse table instead, updated by a trigger whenever an
+-- inventory row enters or leaves the low-stock band (quantity_on_hand < 5).
+-- Reads become a primary-key lookup and stay exact, unlike a materialized
+-- view refreshed on a schedule.
+
+-- =============================================================================
+-- STEP 1: Counter table
+-- =============================================================================
+CREATE TABLE IF NOT EXISTS public.warehouse_low_stock_counts (
+    warehouse_id UUID PRIMARY KEY REFERENCES public.warehouses(id) ON DELETE CASCADE,
+    low_stock_count INTEGER NOT NULL DEFAULT 0
+);
+
+ALTER TABLE public.warehouse_low_stock_counts ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Select low stock counts for own warehouse or admin or viewer"
+    ON public.warehouse_low_stock_counts FOR SELECT
+    USING (
+        warehouse_id IN (
+            SELECT id FROM public.warehouses
+            WHERE manager_id = (SELECT auth.uid())
+        )
+        OR
+        public.is_admin()
+        OR
+        public.is_viewer()
+    );
+
+-- =============================================================================
+-- STEP 2: Keep the counter in sync with inventory_items
+-- =============================================================================
+CREATE OR REPLACE FUNCTION public.sync_low_stock_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Row leaves the low-stock band (or its warehouse)
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.quantity_on_hand < 5 THEN
+        UPDATE public.warehouse_low_stock_counts
+        SET low_stock_count = low_stock_count - 1
+        WHERE warehouse_id = OLD.warehouse_id;
+    END IF;
+
+    -- Row enters the low-stock band (or a new warehouse)
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.quantity_on_hand < 5 THEN
+        INSERT INTO public.warehouse_low_stock_counts (warehouse_id, low_stock_count)
+        VALUES (NEW.warehouse_id, 1)
+        ON CONFLICT (warehouse_id) DO UPDATE
+        SET low_stock_count = public.warehouse_low_stock_counts.low_stock_count + 1;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = '';
+
+DROP TRIGGER IF EXISTS sync_inventory_low_stock_count ON public.inventory_items;
+
+CREATE TRIGGER sync_inventory_low_stock_count
+    AFTER INSERT OR DELETE OR UPDATE OF quantity_on_hand, warehouse_id
+    ON public.inventory_items
+    FOR EACH ROW
+    EXECUTE FUNCTION public.sync_low_stock_count();
+
+-- =============================================================================
+-- STEP 3: Backfill from current inventory
+-- =============================================================================
+INSERT INTO public.warehouse_low_stock_counts (warehouse_id, low_stock_count)
+SELECT warehouse_id, COUNT(*)::INTEGER
+FROM public.inventory_items
+WHERE quantity_on_hand < 5
+GROUP BY warehouse_id
+ON CONFLICT (warehouse_id) DO UPDATE
+SET low_stock_count = EXCLUDED.low_stock_count;
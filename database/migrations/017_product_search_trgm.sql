@@ -0,0 +1,20 @@
+-- Migration 017: Trigram indexes for product search
+-- Run this in Supabase SQL editor
+--
+-- Inventory search filters products with
+--   sku ILIKE '%term%' OR name ILIKE '%term%' OR brand ILIKE '%term%'
+-- Leading-wildcard ILIKE cannot use a btree index, so every search was a
+-- sequential scan of products. One trigram GIN index per searched column
+-- lets the planner answer each branch from its index and combine them with
+-- a BitmapOr, without changing the query the API sends.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA extensions;
+
+CREATE INDEX IF NOT EXISTS idx_products_sku_trgm
+ON public.products USING gin (sku extensions.gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_products_name_trgm
+ON public.products USING gin (name extensions.gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_products_brand_trgm
+ON public.products USING gin (brand extensions.gin_trgm_ops);
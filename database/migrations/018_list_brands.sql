@@ -0,0 +1,17 @@
+-- Migration 018: Distinct brand list computed in the database
+-- Run this in Supabase SQL editor
+--
+-- GET /api/brands used to select the brand column of every product and
+-- deduplicate in the API route. list_brands() returns only the distinct
+-- values, and the btree index lets DISTINCT be answered from the index.
+
+CREATE INDEX IF NOT EXISTS idx_products_brand
+ON public.products(brand);
+
+CREATE OR REPLACE FUNCTION public.list_brands()
+RETURNS TABLE(brand TEXT) AS $$
+    SELECT DISTINCT p.brand
+    FROM public.products p
+    WHERE p.brand IS NOT NULL AND p.brand <> ''
+    ORDER BY p.brand;
+$$ LANGUAGE sql STABLE SET search_path = '';
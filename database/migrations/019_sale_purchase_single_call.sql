@@ -0,0 +1,154 @@
+-- Migration 019: Single-call sale and purchase RPCs
+-- Run this in Supabase SQL editor
+--
+-- POST /api/sales and POST /api/purchases used to validate the warehouse and
+-- product, read stock before or after the RPC, and then call record_sale /
+-- record_purchase: four to five PostgREST round trips per request.
+-- The functions now do the validation themselves, default the price from the
+-- product, and return everything the API response needs, so each endpoint
+-- makes exactly one call.
+--
+-- Missing warehouse/product raise SQLSTATE P0002 (no_data_found), which the
+-- API routes map to 404. Every other failure is a plain exception (400).
+--
+-- The return type changes, so the old functions are dropped first.
+
+DROP FUNCTION IF EXISTS public.record_sale(UUID, UUID, INTEGER, NUMERIC, TEXT, UUID);
+DROP FUNCTION IF EXISTS public.record_purchase(UUID, UUID, INTEGER, NUMERIC, TEXT, UUID, UUID);
+
+-- =============================================================================
+-- record_sale
+-- =============================================================================
+CREATE FUNCTION public.record_sale(
+    p_warehouse_id UUID,
+    p_product_id UUID,
+    p_quantity INTEGER,
+    p_unit_price NUMERIC,
+    p_note TEXT,
+    p_user_id UUID
+) RETURNS TABLE(
+    transaction_id UUID,
+    product_name TEXT,
+    unit_price NUMERIC,
+    new_stock_level INTEGER
+) AS $$
+DECLARE
+    v_product_name TEXT;
+    v_retail_price NUMERIC;
+    v_unit_price NUMERIC;
+    v_inventory_id UUID;
+    v_current_qty INTEGER;
+    v_new_qty INTEGER;
+    v_transaction_id UUID;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM public.warehouses WHERE id = p_warehouse_id) THEN
+        RAISE EXCEPTION 'Warehouse not found' USING ERRCODE = 'P0002';
+    END IF;
+
+    SELECT p.name, p.retail_price INTO v_product_name, v_retail_price
+    FROM public.products p
+    WHERE p.id = p_product_id;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Product not found' USING ERRCODE = 'P0002';
+    END IF;
+
+    v_unit_price := COALESCE(p_unit_price, v_retail_price);
+
+    SELECT inv.id, inv.quantity_on_hand INTO v_inventory_id, v_current_qty
+    FROM public.inventory_items inv
+    WHERE inv.warehouse_id = p_warehouse_id AND inv.product_id = p_product_id
+    FOR UPDATE;
+
+    IF v_inventory_id IS NULL OR v_current_qty < p_quantity THEN
+        RAISE EXCEPTION 'Insufficient stock. Available: %, Requested: %',
+            COALESCE(v_current_qty, 0), p_quantity;
+    END IF;
+
+    UPDATE public.inventory_items
+    SET quantity_on_hand = quantity_on_hand - p_quantity
+    WHERE id = v_inventory_id
+    RETURNING quantity_on_hand INTO v_new_qty;
+
+    INSERT INTO public.transactions (
+        transaction_type, product_id, from_warehouse_id,
+        quantity, unit_price, reference_note, created_by
+    )
+    VALUES (
+        'SALE', p_product_id, p_warehouse_id,
+        p_quantity, v_unit_price, p_note, p_user_id
+    )
+    RETURNING id INTO v_transaction_id;
+
+    RETURN QUERY SELECT v_transaction_id, v_product_name, v_unit_price, v_new_qty;
+END;
+$$ LANGUAGE plpgsql SET search_path = '';
+
+-- =============================================================================
+-- record_purchase
+-- =============================================================================
+CREATE FUNCTION public.record_purchase(
+    p_warehouse_id UUID,
+    p_product_id UUID,
+    p_quantity INTEGER,
+    p_unit_cost NUMERIC,
+    p_note TEXT,
+    p_user_id UUID,
+    p_batch_id UUID DEFAULT NULL
+) RETURNS TABLE(
+    transaction_id UUID,
+    product_name TEXT,
+    unit_price NUMERIC,
+    new_stock_level INTEGER
+) AS $$
+DECLARE
+    v_product_name TEXT;
+    v_cost_price NUMERIC;
+    v_unit_cost NUMERIC;
+    v_inventory_id UUID;
+    v_new_qty INTEGER;
+    v_transaction_id UUID;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM public.warehouses WHERE id = p_warehouse_id) THEN
+        RAISE EXCEPTION 'Warehouse not found' USING ERRCODE = 'P0002';
+    END IF;
+
+    SELECT p.name, p.cost_price INTO v_product_name, v_cost_price
+    FROM public.products p
+    WHERE p.id = p_product_id;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Product not found' USING ERRCODE = 'P0002';
+    END IF;
+
+    v_unit_cost := COALESCE(p_unit_cost, v_cost_price);
+
+    SELECT inv.id INTO v_inventory_id
+    FROM public.inventory_items inv
+    WHERE inv.warehouse_id = p_warehouse_id AND inv.product_id = p_product_id
+    FOR UPDATE;
+
+    IF v_inventory_id IS NULL THEN
+        INSERT INTO public.inventory_items (warehouse_id, product_id, quantity_on_hand)
+        VALUES (p_warehouse_id, p_product_id, p_quantity)
+        RETURNING quantity_on_hand INTO v_new_qty;
+    ELSE
+        UPDATE public.inventory_items
+        SET quantity_on_hand = quantity_on_hand + p_quantity
+        WHERE id = v_inventory_id
+        RETURNING quantity_on_hand INTO v_new_qty;
+    END IF;
+
+    INSERT INTO public.transactions (
+        transaction_type, product_id, to_warehouse_id,
+        quantity, unit_price, reference_note, created_by, batch_id
+    )
+    VALUES (
+        'RESTOCK', p_product_id, p_warehouse_id,
+        p_quantity, v_unit_cost, p_note, p_user_id, p_batch_id
+    )
+    RETURNING id INTO v_transaction_id;
+
+    RETURN QUERY SELECT v_transaction_id, v_product_name, v_unit_cost, v_new_qty;
+END;
+$$ LANGUAGE plpgsql SET search_path = '';
@@ -0,0 +1,64 @@
+-- Migration 020: Race-free stock increment in record_purchase
+-- Run this in Supabase SQL editor
+--
+-- record_purchase looked up the inventory row with SELECT ... FOR UPDATE and
+-- inserted it when missing. FOR UPDATE locks nothing when the row does not
+-- exist yet, so two concurrent first purchases of a product could both take
+-- the insert branch and the second failed on unique_warehouse_product.
+-- A single INSERT ... ON CONFLICT DO UPDATE against that constraint
+-- increments atomically in one statement.
+
+CREATE OR REPLACE FUNCTION public.record_purchase(
+    p_warehouse_id UUID,
+    p_product_id UUID,
+    p_quantity INTEGER,
+    p_unit_cost NUMERIC,
+    p_note TEXT,
+    p_user_id UUID,
+    p_batch_id UUID DEFAULT NULL
+) RETURNS TABLE(
+    transaction_id UUID,
+    product_name TEXT,
+    unit_price NUMERIC,
+    new_stock_level INTEGER
+) AS $$
+DECLARE
+    v_product_name TEXT;
+    v_cost_price NUMERIC;
+    v_unit_cost NUMERIC;
+    v_new_qty INTEGER;
+    v_transaction_id UUID;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM public.warehouses WHERE id = p_warehouse_id) THEN
+        RAISE EXCEPTION 'Warehouse not found' USING ERRCODE = 'P0002';
+    END IF;
+
+    SELECT p.name, p.cost_price INTO v_product_name, v_cost_price
+    FROM public.products p
+    WHERE p.id = p_product_id;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Product not found' USING ERRCODE = 'P0002';
+    END IF;
+
+    v_unit_cost := COALESCE(p_unit_cost, v_cost_price);
+
+    INSERT INTO public.inventory_items AS inv (warehouse_id, product_id, quantity_on_hand)
+    VALUES (p_warehouse_id, p_product_id, p_quantity)
+    ON CONFLICT ON CONSTRAINT unique_warehouse_product DO UPDATE
+    SET quantity_on_hand = inv.quantity_on_hand + EXCLUDED.quantity_on_hand
+    RETURNING inv.quantity_on_hand INTO v_new_qty;
+
+    INSERT INTO public.transactions (
+        transaction_type, product_id, to_warehouse_id,
+        quantity, unit_price, reference_note, created_by, batch_id
+    )
+    VALUES (
+        'RESTOCK', p_product_id, p_warehouse_id,
+        p_quantity, v_unit_cost, p_note, p_user_id, p_batch_id
+    )
+    RETURNING id INTO v_transaction_id;
+
+    RETURN QUERY SELECT v_transaction_id, v_product_name, v_unit_cost, v_new_qty;
+END;
+$$ LANGUAGE plpgsql SET search_path = '';
@@ -0,0 +1,17 @@
+-- Migration 021: Keyset pagination indexes for transaction history
+-- Run this in Supabase SQL editor
+--
+-- GET /api/transactions/[warehouseId] now accepts a (before, before_id)
+-- cursor and orders by created_at DESC, id DESC. These composite indexes
+-- match that order per warehouse direction, so a page is an index range scan
+-- that stops after page_size rows instead of an OFFSET that reads and
+-- discards every earlier row. Soft-deleted rows are excluded, matching the
+-- route's deleted_at IS NULL filter.
+
+CREATE INDEX IF NOT EXISTS idx_transactions_from_warehouse_created
+ON public.transactions(from_warehouse_id, created_at DESC, id DESC)
+WHERE deleted_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_transactions_to_warehouse_created
+ON public.transactions(to_warehouse_id, created_at DESC, id DESC)
+WHERE deleted_at IS NULL;
@@ -0,0 +1,62 @@
+-- Migration 022: UNION ALL listing of a warehouse's transactions
+-- Run this in Supabase SQL editor
+--
+-- The unfiltered history view selected
+--   WHERE from_warehouse_id = X OR to_warehouse_id = X
+--   ORDER BY created_at DESC, id DESC LIMIT n
+-- The planner can't walk the per-direction (warehouse, created_at, id)
+-- indexes from migration 021 through the OR, so it scanned every one of the
+-- warehouse's rows and sorted them. list_warehouse_transactions runs one
+-- index range scan per direction, each stopping at offset + limit rows, and
+-- merges the two.
+--
+-- Supports the same brand filter (p_product_ids) and keyset cursor
+-- (p_before, p_before_id) as GET /api/transactions/[warehouseId].
+-- SECURITY INVOKER, so RLS on transactions still applies.
+
+CREATE OR REPLACE FUNCTION public.list_warehouse_transactions(
+    p_warehouse_id UUID,
+    p_limit INTEGER,
+    p_offset INTEGER DEFAULT 0,
+    p_product_ids UUID[] DEFAULT NULL,
+    p_before TIMESTAMPTZ DEFAULT NULL,
+    p_before_id UUID DEFAULT NULL
+) RETURNS SETOF public.transactions AS $$
+    SELECT u.*
+    FROM (
+        (
+            SELECT t.*
+            FROM public.transactions t
+            WHERE t.from_warehouse_id = p_warehouse_id
+              AND t.deleted_at IS NULL
+              AND (p_product_ids IS NULL OR t.product_id = ANY(p_product_ids))
+              AND (
+                  p_before IS NULL
+                  OR t.created_at < p_before
+                  OR (p_before_id IS NOT NULL AND t.created_at = p_before AND t.id < p_before_id)
+              )
+            ORDER BY t.created_at DESC, t.id DESC
+            LIMIT p_limit + p_offset
+        )
+        UNION ALL
+        (
+            SELECT t.*
+            FROM public.transactions t
+            WHERE t.to_warehouse_id = p_warehouse_id
+              -- Rows with both sides on this warehouse come from the first branch
+              AND t.from_warehouse_id IS DISTINCT FROM p_warehouse_id
+              AND t.deleted_at IS NULL
+              AND (p_product_ids IS NULL OR t.product_id = ANY(p_product_ids))
+              AND (
+                  p_before IS NULL
+                  OR t.created_at < p_before
+                  OR (p_before_id IS NOT NULL AND t.created_at = p_before AND t.id < p_before_id)
+              )
+            ORDER BY t.created_at DESC, t.id DESC
+            LIMIT p_limit + p_offset
+        )
+    ) u
+    ORDER BY u.created_at DESC, u.id DESC
+    OFFSET p_offset
+    LIMIT p_limit;
+$$ LANGUAGE sql STABLE SET search_path = '';
@@ -0,0 +1,91 @@
+-- Migration 023: Single-call transfer RPC
+-- Run this in Supabase SQL editor
+--
+-- POST /api/transfers looked up the source warehouse, destination warehouse,
+-- product and source stock one request at a time before calling
+-- record_transfer: five sequential PostgREST round trips per transfer.
+-- record_transfer now validates the warehouses and product itself (SQLSTATE
+-- P0002, mapped to 404 like record_sale / record_purchase in migration 019),
+-- checks stock under the row lock it already takes, and defaults the note
+-- to 'Transfer to <destination>', so the route makes exactly one call.
+--
+-- The destination row is incremented with INSERT ... ON CONFLICT against
+-- unique_warehouse_product, so two concurrent first transfers of a product
+-- into a warehouse can't both take the insert branch (see migration 020).
+
+CREATE OR REPLACE FUNCTION public.record_transfer(
+    p_from_warehouse_id UUID,
+    p_to_warehouse_id UUID,
+    p_product_id UUID,
+    p_quantity INTEGER,
+    p_note TEXT,
+    p_user_id UUID
+) RETURNS TABLE(transfer_out_id UUID, transfer_in_id UUID) AS $$
+DECLARE
+    v_dest_name TEXT;
+    v_note TEXT;
+    v_from_inventory_id UUID;
+    v_current_qty INTEGER;
+    v_transfer_out_id UUID;
+    v_transfer_in_id UUID;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM public.warehouses WHERE id = p_from_warehouse_id) THEN
+        RAISE EXCEPTION 'Source warehouse not found' USING ERRCODE = 'P0002';
+    END IF;
+
+    SELECT w.name INTO v_dest_name
+    FROM public.warehouses w
+    WHERE w.id = p_to_warehouse_id;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Destination warehouse not found' USING ERRCODE = 'P0002';
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM public.products WHERE id = p_product_id) THEN
+        RAISE EXCEPTION 'Product not found' USING ERRCODE = 'P0002';
+    END IF;
+
+    v_note := COALESCE(NULLIF(p_note, ''), 'Transfer to ' || v_dest_name);
+
+    SELECT inv.id, inv.quantity_on_hand INTO v_from_inventory_id, v_current_qty
+    FROM public.inventory_items inv
+    WHERE inv.warehouse_id = p_from_warehouse_id AND inv.product_id = p_product_id
+    FOR UPDATE;
+
+    IF v_from_inventory_id IS NULL OR v_current_qty < p_quantity THEN
+        RAISE EXCEPTION 'Insufficient stock. Available: %, Requested: %',
+            COALESCE(v_current_qty, 0), p_quantity;
+    END IF;
+
+    UPDATE public.inventory_items
+    SET quantity_on_hand = quantity_on_hand - p_quantity
+    WHERE id = v_from_inventory_id;
+
+    INSERT INTO public.inventory_items AS inv (warehouse_id, product_id, quantity_on_hand)
+    VALUES (p_to_warehouse_id, p_product_id, p_quantity)
+    ON CONFLICT ON CONSTRAINT unique_warehouse_product DO UPDATE
+    SET quantity_on_hand = inv.quantity_on_hand + EXCLUDED.quantity_on_hand;
+
+    INSERT INTO public.transactions (
+        transaction_type, product_id, from_warehouse_id, to_warehouse_id,
+        quantity, reference_note, created_by
+    )
+    VALUES (
+        'TRANSFER_OUT', p_product_id, p_from_warehouse_id, p_to_warehouse_id,
+        p_quantity, v_note, p_user_id
+    )
+    RETURNING id INTO v_transfer_out_id;
+
+    INSERT INTO public.transactions (
+        transaction_type, product_id, from_warehouse_id, to_warehouse_id,
+        quantity, reference_note, created_by
+    )
+    VALUES (
+        'TRANSFER_IN', p_product_id, p_from_warehouse_id, p_to_warehouse_id,
+        p_quantity, v_note, p_user_id
+    )
+    RETURNING id INTO v_transfer_in_id;
+
+    RETURN QUERY SELECT v_transfer_out_id, v_transfer_in_id;
+END;
+$$ LANGUAGE plpgsql SET search_path = '';
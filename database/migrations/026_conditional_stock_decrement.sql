@@ -0,0 +1,274 @@
+-- Migration 026: Conditional stock decrement in sale and transfer RPCs
+-- Run this in Supabase SQL editor
+--
+-- record_sale, record_transfer and record_bulk_transfer locked the source
+-- inventory row with SELECT ... FOR UPDATE, checked the quantity and then
+-- updated it. A single
+--   UPDATE ... SET quantity_on_hand = quantity_on_hand - n
+--   WHERE ... AND quantity_on_hand >= n
+-- takes the same row lock, re-checks the condition against the latest row
+-- version and decrements in one statement. Zero rows updated means not
+-- enough stock; the current quantity is only read on that path, for the
+-- error message.
+
+-- =============================================================================
+-- record_sale
+-- =============================================================================
+CREATE OR REPLACE FUNCTION public.record_sale(
+    p_warehouse_id UUID,
+    p_product_id UUID,
+    p_quantity INTEGER,
+    p_unit_price NUMERIC,
+    p_note TEXT,
+    p_user_id UUID
+) RETURNS TABLE(
+    transaction_id UUID,
+    product_name TEXT,
+    unit_price NUMERIC,
+    new_stock_level INTEGER
+) AS $$
+DECLARE
+    v_product_name TEXT;
+    v_retail_price NUMERIC;
+    v_unit_price NUMERIC;
+    v_current_qty INTEGER;
+    v_new_qty INTEGER;
+    v_transaction_id UUID;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM public.warehouses WHERE id = p_warehouse_id) THEN
+        RAISE EXCEPTION 'Warehouse not found' USING ERRCODE = 'P0002';
+    END IF;
+
+    SELECT p.name, p.retail_price INTO v_product_name, v_retail_price
+    FROM public.products p
+    WHERE p.id = p_product_id;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Product not found' USING ERRCODE = 'P0002';
+    END IF;
+
+    v_unit_price := COALESCE(p_unit_price, v_retail_price);
+
+    UPDATE public.inventory_items inv
+    SET quantity_on_hand = inv.quantity_on_hand - p_quantity
+    WHERE inv.warehouse_id = p_warehouse_id
+      AND inv.product_id = p_product_id
+      AND inv.quantity_on_hand >= p_quantity
+    RETURNING inv.quantity_on_hand INTO v_new_qty;
+
+    IF NOT FOUND THEN
+        SELECT inv.quantity_on_hand INTO v_current_qty
+        FROM public.inventory_items inv
+        WHERE inv.warehouse_id = p_warehouse_id AND inv.product_id = p_product_id;
+
+        RAISE EXCEPTION 'Insufficient stock. Available: %, Requested: %',
+            COALESCE(v_current_qty, 0), p_quantity;
+    END IF;
+
+    INSERT INTO public.transactions (
+        transaction_type, product_id, from_warehouse_id,
+        quantity, unit_price, reference_note, created_by
+    )
+    VALUES (
+        'SALE', p_product_id, p_warehouse_id,
+        p_quantity, v_unit_price, p_note, p_user_id
+    )
+    RETURNING id INTO v_transaction_id;
+
+    RETURN QUERY SELECT v_transaction_id, v_product_name, v_unit_price, v_new_qty;
+END;
+$$ LANGUAGE plpgsql SET search_path = '';
+
+-- =============================================================================
+-- record_transfer
+-- =============================================================================
+CREATE OR REPLACE FUNCTION public.record_transfer(
+    p_from_warehouse_id UUID,
+    p_to_warehouse_id UUID,
+    p_product_id UUID,
+    p_quantity INTEGER,
+    p_note TEXT,
+    p_user_id UUID
+) RETURNS TABLE(transfer_out_id UUID, transfer_in_id UUID) AS $$
+DECLARE
+    v_dest_name TEXT;
+    v_note TEXT;
+    v_current_qty INTEGER;
+    v_transfer_out_id UUID;
+    v_transfer_in_id UUID;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM public.warehouses WHERE id = p_from_warehouse_id) THEN
+        RAISE EXCEPTION 'Source warehouse not found' USING ERRCODE = 'P0002';
+    END IF;
+
+    SELECT w.name INTO v_dest_name
+    FROM public.warehouses w
+    WHERE w.id = p_to_warehouse_id;
+
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Destination warehouse not found' USING ERRCODE = 'P0002';
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM public.products WHERE id = p_product_id) THEN
+        RAISE EXCEPTION 'Product not found' USING ERRCODE = 'P0002';
+    END IF;
+
+    v_note := COALESCE(NULLIF(p_note, ''), 'Transfer to ' || v_dest_name);
+
+    UPDATE public.inventory_items inv
+    SET quantity_on_hand = inv.quantity_on_hand - p_quantity
+    WHERE inv.warehouse_id = p_from_warehouse_id
+      AND inv.product_id = p_product_id
+      AND inv.quantity_on_hand >= p_quantity;
+
+    IF NOT FOUND THEN
+        SELECT inv.quantity_on_hand INTO v_current_qty
+        FROM public.inventory_items inv
+        WHERE inv.warehouse_id = p_from_warehouse_id AND inv.product_id = p_product_id;
+
+        RAISE EXCEPTION 'Insufficient stock. Available: %, Requested: %',
+            COALESCE(v_current_qty, 0), p_quantity;
+    END IF;
+
+    INSERT INTO public.inventory_items AS inv (warehouse_id, product_id, quantity_on_hand)
+    VALUES (p_to_warehouse_id, p_product_id, p_quantity)
+    ON CONFLICT ON CONSTRAINT unique_warehouse_product DO UPDATE
+    SET quantity_on_hand = inv.quantity_on_hand + EXCLUDED.quantity_on_hand;
+
+    WITH inserted AS (
+        INSERT INTO public.transactions (
+            transaction_type, product_id, from_warehouse_id, to_warehouse_id,
+            quantity, reference_note, created_by
+        )
+        VALUES
+            ('TRANSFER_OUT', p_product_id, p_from_warehouse_id, p_to_warehouse_id,
+             p_quantity, v_note, p_user_id),
+            ('TRANSFER_IN', p_product_id, p_from_warehouse_id, p_to_warehouse_id,
+             p_quantity, v_note, p_user_id)
+        RETURNING id, transaction_type
+    )
+    SELECT
+        (array_agg(i.id) FILTER (WHERE i.transaction_type = 'TRANSFER_OUT'))[1],
+        (array_agg(i.id) FILTER (WHERE i.transaction_type = 'TRANSFER_IN'))[1]
+    INTO v_transfer_out_id, v_transfer_in_id
+    FROM inserted i;
+
+    RETURN QUERY SELECT v_transfer_out_id, v_transfer_in_id;
+END;
+$$ LANGUAGE plpgsql SET search_path = '';
+
+-- =============================================================================
+-- record_bulk_transfer
+-- =============================================================================
+CREATE OR REPLACE FUNCTION public.record_bulk_transfer(
+    p_from_warehouse_id UUID,
+    p_to_warehouse_id UUID,
+    p_items JSONB,
+    p_note TEXT,
+    p_user_id UUID
+) RETURNS TABLE(
+    product_id UUID,
+    success BOOLEAN,
+    error_message TEXT,
+    transfer_out_id UUID,
+    transfer_in_id UUID
+) AS $fn$
+DECLARE
+    v_item RECORD;
+    v_current_qty INTEGER;
+    v_transfer_out_id UUID;
+    v_transfer_in_id UUID;
+    v_item_count INTEGER;
+BEGIN
+    SELECT COUNT(*)::INTEGER INTO v_item_count
+    FROM (
+        SELECT (elem->>'product_id')::UUID AS pid
+        FROM jsonb_array_elements(p_items) AS elem
+        WHERE elem->>'product_id' IS NOT NULL
+          AND (elem->>'quantity')::INT > 0
+        GROUP BY (elem->>'product_id')::UUID
+    ) deduped;
+
+    IF v_item_count > 100 THEN
+        RAISE EXCEPTION 'Batch size exceeds limit of 100 items. Got % items.', v_item_count;
+    END IF;
+
+    IF v_item_count = 0 THEN
+        RAISE EXCEPTION 'No valid items to transfer';
+    END IF;
+
+    FOR v_item IN
+        SELECT
+            (pid)::UUID AS product_id,
+            SUM(qty)::INTEGER AS quantity
+        FROM (
+            SELECT
+                (elem->>'product_id')::UUID AS pid,
+                COALESCE((elem->>'quantity')::INT, 0) AS qty
+            FROM jsonb_array_elements(p_items) AS elem
+            WHERE elem->>'product_id' IS NOT NULL
+              AND (elem->>'quantity')::INT > 0
+        ) raw
+        GROUP BY pid
+        ORDER BY pid
+    LOOP
+        BEGIN
+            UPDATE public.inventory_items inv
+            SET quantity_on_hand = inv.quantity_on_hand - v_item.quantity
+            WHERE inv.warehouse_id = p_from_warehouse_id
+              AND inv.product_id = v_item.product_id
+              AND inv.quantity_on_hand >= v_item.quantity;
+
+            IF NOT FOUND THEN
+                SELECT inv.quantity_on_hand INTO v_current_qty
+                FROM public.inventory_items inv
+                WHERE inv.warehouse_id = p_from_warehouse_id AND inv.product_id = v_item.product_id;
+
+                IF NOT FOUND THEN
+                    RAISE EXCEPTION 'Product % not found in source warehouse', v_item.product_id;
+                END IF;
+
+                RAISE EXCEPTION 'Insufficient stock: % available, % requested', v_current_qty, v_item.quantity;
+            END IF;
+
+            INSERT INTO public.inventory_items AS inv (warehouse_id, product_id, quantity_on_hand)
+            VALUES (p_to_warehouse_id, v_item.product_id, v_item.quantity)
+            ON CONFLICT ON CONSTRAINT unique_warehouse_product DO UPDATE
+            SET quantity_on_hand = inv.quantity_on_hand + EXCLUDED.quantity_on_hand;
+
+            WITH inserted AS (
+                INSERT INTO public.transactions (
+                    transaction_type, product_id, from_warehouse_id, to_warehouse_id,
+                    quantity, reference_note, created_by
+                )
+                VALUES
+                    ('TRANSFER_OUT', v_item.product_id, p_from_warehouse_id, p_to_warehouse_id,
+                     v_item.quantity, p_note, p_user_id),
+                    ('TRANSFER_IN', v_item.product_id, p_from_warehouse_id, p_to_warehouse_id,
+                     v_item.quantity, p_note, p_user_id)
+                RETURNING id, transaction_type
+            )
+            SELECT
+                (array_agg(i.id) FILTER (WHERE i.transaction_type = 'TRANSFER_OUT'))[1],
+                (array_agg(i.id) FILTER (WHERE i.transaction_type = 'TRANSFER_IN'))[1]
+            INTO v_transfer_out_id, v_transfer_in_id
+            FROM inserted i;
+
+            product_id := v_item.product_id;
+            success := TRUE;
+            error_message := NULL;
+            transfer_out_id := v_transfer_out_id;
+            transfer_in_id := v_transfer_in_id;
+            RETURN NEXT;
+
+        EXCEPTION WHEN OTHERS THEN
+            product_id := v_item.product_id;
+            success := FALSE;
+            error_message := SQLERRM;
+            transfer_out_id := NULL;
+            transfer_in_id := NULL;
+            RETURN NEXT;
+        END;
+    END LOOP;
+END;
+$fn$ LANGUAGE plpgsql SET search_path = '';
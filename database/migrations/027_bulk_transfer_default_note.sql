@@ -0,0 +1,127 @@
+-- Migration 027: Default bulk transfer note in the database
+-- Run this in Supabase SQL editor
+--
+-- POST /api/transfers/bulk needed the destination warehouse's name only to
+-- build the default 'Bulk transfer to <destination>' note. Like
+-- record_transfer (migration 023), record_bulk_transfer now fills in that
+-- default itself when p_note is NULL or empty.
+
+CREATE OR REPLACE FUNCTION public.record_bulk_transfer(
+    p_from_warehouse_id UUID,
+    p_to_warehouse_id UUID,
+    p_items JSONB,
+    p_note TEXT,
+    p_user_id UUID
+) RETURNS TABLE(
+    product_id UUID,
+    success BOOLEAN,
+    error_message TEXT,
+    transfer_out_id UUID,
+    transfer_in_id UUID
+) AS $fn$
+DECLARE
+    v_item RECORD;
+    v_current_qty INTEGER;
+    v_transfer_out_id UUID;
+    v_transfer_in_id UUID;
+    v_item_count INTEGER;
+    v_note TEXT;
+BEGIN
+    SELECT COUNT(*)::INTEGER INTO v_item_count
+    FROM (
+        SELECT (elem->>'product_id')::UUID AS pid
+        FROM jsonb_array_elements(p_items) AS elem
+        WHERE elem->>'product_id' IS NOT NULL
+          AND (elem->>'quantity')::INT > 0
+        GROUP BY (elem->>'product_id')::UUID
+    ) deduped;
+
+    IF v_item_count > 100 THEN
+        RAISE EXCEPTION 'Batch size exceeds limit of 100 items. Got % items.', v_item_count;
+    END IF;
+
+    IF v_item_count = 0 THEN
+        RAISE EXCEPTION 'No valid items to transfer';
+    END IF;
+
+    v_note := COALESCE(NULLIF(p_note, ''), (
+        SELECT 'Bulk transfer to ' || w.name
+        FROM public.warehouses w
+        WHERE w.id = p_to_warehouse_id
+    ));
+
+    FOR v_item IN
+        SELECT
+            (pid)::UUID AS product_id,
+            SUM(qty)::INTEGER AS quantity
+        FROM (
+            SELECT
+                (elem->>'product_id')::UUID AS pid,
+                COALESCE((elem->>'quantity')::INT, 0) AS qty
+            FROM jsonb_array_elements(p_items) AS elem
+            WHERE elem->>'product_id' IS NOT NULL
+              AND (elem->>'quantity')::INT > 0
+        ) raw
+        GROUP BY pid
+        ORDER BY pid
+    LOOP
+        BEGIN
+            UPDATE public.inventory_items inv
+            SET quantity_on_hand = inv.quantity_on_hand - v_item.quantity
+            WHERE inv.warehouse_id = p_from_warehouse_id
+              AND inv.product_id = v_item.product_id
+              AND inv.quantity_on_hand >= v_item.quantity;
+
+            IF NOT FOUND THEN
+                SELECT inv.quantity_on_hand INTO v_current_qty
+                FROM public.inventory_items inv
+                WHERE inv.warehouse_id = p_from_warehouse_id AND inv.product_id = v_item.product_id;
+
+                IF NOT FOUND THEN
+                    RAISE EXCEPTION 'Product % not found in source warehouse', v_item.product_id;
+                END IF;
+
+                RAISE EXCEPTION 'Insufficient stock: % available, % requested', v_current_qty, v_item.quantity;
+            END IF;
+
+            INSERT INTO public.inventory_items AS inv (warehouse_id, product_id, quantity_on_hand)
+            VALUES (p_to_warehouse_id, v_item.product_id, v_item.quantity)
+            ON CONFLICT ON CONSTRAINT unique_warehouse_product DO UPDATE
+            SET quantity_on_hand = inv.quantity_on_hand + EXCLUDED.quantity_on_hand;
+
+            WITH inserted AS (
+                INSERT INTO public.transactions (
+                    transaction_type, product_id, from_warehouse_id, to_warehouse_id,
+                    quantity, reference_note, created_by
+                )
+                VALUES
+                    ('TRANSFER_OUT', v_item.product_id, p_from_warehouse_id, p_to_warehouse_id,
+                     v_item.quantity, v_note, p_user_id),
+                    ('TRANSFER_IN', v_item.product_id, p_from_warehouse_id, p_to_warehouse_id,
+                     v_item.quantity, v_note, p_user_id)
+                RETURNING id, transaction_type
+            )
+            SELECT
+                (array_agg(i.id) FILTER (WHERE i.transaction_type = 'TRANSFER_OUT'))[1],
+                (array_agg(i.id) FILTER (WHERE i.transaction_type = 'TRANSFER_IN'))[1]
+            INTO v_transfer_out_id, v_transfer_in_id
+            FROM inserted i;
+
+            product_id := v_item.product_id;
+            success := TRUE;
+            error_message := NULL;
+            transfer_out_id := v_transfer_out_id;
+            transfer_in_id := v_transfer_in_id;
+            RETURN NEXT;
+
+        EXCEPTION WHEN OTHERS THEN
+            product_id := v_item.product_id;
+            success := FALSE;
+            error_message := SQLERRM;
+            transfer_out_id := NULL;
+            transfer_in_id := NULL;
+            RETURN NEXT;
+        END;
+    END LOOP;
+END;
+$fn$ LANGUAGE plpgsql SET search_path = '';
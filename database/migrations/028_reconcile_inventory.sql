@@ -0,0 +1,42 @@
+-- Migration 028: Atomic bulk reconciliation
+-- Run this in Supabase SQL editor
+--
+-- scripts/reconcile_inventory.py added discovered stock to the Main
+-- Warehouse with a separate UPDATE or INSERT request per CSV row, and
+-- recorded the ADJUSTMENT transactions in further requests, so a failure
+-- part way through left stock and ledger out of step.
+-- reconcile_inventory takes the whole reconciliation as JSONB
+--   [{"product_id": "...", "quantity": 3}, ...]
+-- and, in one transaction, records an ADJUSTMENT per item (with
+-- p_reference_note) and adds the quantities to stock with a single
+-- INSERT ... ON CONFLICT DO UPDATE. Rows for the same product are summed
+-- first, because ON CONFLICT can't update a row twice in one statement.
+-- Returns the resulting quantity_on_hand per product.
+
+-- Earlier revision of this migration took no reference note
+DROP FUNCTION IF EXISTS public.reconcile_inventory(UUID, JSONB);
+
+CREATE OR REPLACE FUNCTION public.reconcile_inventory(
+    p_warehouse_id UUID,
+    p_items JSONB,
+    p_reference_note TEXT
+) RETURNS TABLE(product_id UUID, quantity_on_hand INTEGER) AS $$
+    INSERT INTO public.transactions (
+        transaction_type, product_id, to_warehouse_id, quantity, reference_note
+    )
+    SELECT
+        'ADJUSTMENT'::public.transaction_type,
+        (elem->>'product_id')::UUID,
+        p_warehouse_id,
+        (elem->>'quantity')::INTEGER,
+        p_reference_note
+    FROM jsonb_array_elements(p_items) AS elem;
+
+    INSERT INTO public.inventory_items AS inv (warehouse_id, product_id, quantity_on_hand)
+    SELECT p_warehouse_id, (elem->>'product_id')::UUID, SUM((elem->>'quantity')::INTEGER)::INTEGER
+    FROM jsonb_array_elements(p_items) AS elem
+    GROUP BY (elem->>'product_id')::UUID
+    ON CONFLICT ON CONSTRAINT unique_warehouse_product DO UPDATE
+    SET quantity_on_hand = inv.quantity_on_hand + EXCLUDED.quantity_on_hand
+    RETURNING inv.product_id, inv.quantity_on_hand;
+$$ LANGUAGE sql SET search_path = '';
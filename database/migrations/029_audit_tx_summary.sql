@@ -0,0 +1,29 @@
+-- Migration 029: Per-product transaction totals for the inventory audit
+-- Run this in Supabase SQL editor
+--
+-- scripts/audit_inventory.py downloaded every transaction touching the
+-- Main Warehouse and summed quantities per product in Python.
+-- audit_tx_summary returns those sums directly, one row per product,
+-- transaction type and direction ('in' when the warehouse is the
+-- destination, 'out' when it is the source), along with the number of
+-- transactions behind each sum.
+
+CREATE OR REPLACE FUNCTION public.audit_tx_summary(p_warehouse_id UUID)
+RETURNS TABLE(
+    product_id UUID,
+    transaction_type TEXT,
+    direction TEXT,
+    total BIGINT,
+    tx_count BIGINT
+) AS $$
+    SELECT
+        t.product_id,
+        t.transaction_type::TEXT,
+        CASE WHEN t.to_warehouse_id = p_warehouse_id THEN 'in' ELSE 'out' END,
+        SUM(t.quantity)::BIGINT,
+        COUNT(*)
+    FROM public.transactions t
+    WHERE t.to_warehouse_id = p_warehouse_id
+       OR t.from_warehouse_id = p_warehouse_id
+    GROUP BY 1, 2, 3;
+$$ LANGUAGE sql STABLE SET search_path = '';
@@ -0,0 +1,76 @@
+-- Migration 030: Create, confirm and pay an invoice in one call
+-- Run this in Supabase SQL editor
+--
+-- scripts/import_invoice_sale.py created an invoice with five sequential
+-- requests (insert invoice, insert items, confirm_invoice, insert payment,
+-- update invoice) and cleaned up by hand when one of them failed.
+-- create_invoice_with_items_and_payment runs the same steps in a single
+-- transaction, so any failure (e.g. insufficient stock) rolls back
+-- everything. Arguments:
+--   p_invoice  {"warehouse_id", "customer_name", "notes", "subtotal", "discount", "total"}
+--   p_items    [{"product_id", "quantity", "unit_price"}, ...]
+--   p_payment  {"amount", "payment_method", "reference_note"} or NULL
+-- Returns the final invoice row.
+
+CREATE OR REPLACE FUNCTION public.create_invoice_with_items_and_payment(
+    p_invoice JSONB,
+    p_items JSONB,
+    p_payment JSONB,
+    p_user_id UUID
+) RETURNS public.invoices AS $$
+DECLARE
+    v_invoice public.invoices;
+    v_amount NUMERIC(12, 2);
+BEGIN
+    -- Create the invoice in DRAFT status
+    INSERT INTO public.invoices (
+        warehouse_id, customer_name, notes, subtotal, discount, total, created_by
+    )
+    VALUES (
+        (p_invoice->>'warehouse_id')::UUID,
+        p_invoice->>'customer_name',
+        p_invoice->>'notes',
+        (p_invoice->>'subtotal')::NUMERIC,
+        COALESCE((p_invoice->>'discount')::NUMERIC, 0),
+        (p_invoice->>'total')::NUMERIC,
+        p_user_id
+    )
+    RETURNING * INTO v_invoice;
+
+    -- Add every line item in one statement
+    INSERT INTO public.invoice_items (invoice_id, product_id, quantity, unit_price, line_total)
+    SELECT
+        v_invoice.id,
+        (elem->>'product_id')::UUID,
+        (elem->>'quantity')::INTEGER,
+        (elem->>'unit_price')::NUMERIC,
+        (elem->>'quantity')::INTEGER * (elem->>'unit_price')::NUMERIC
+    FROM jsonb_array_elements(p_items) AS elem;
+
+    -- Reserve stock and record SALE transactions
+    PERFORM public.confirm_invoice(v_invoice.id, p_user_id);
+
+    -- Optional payment
+    IF p_payment IS NOT NULL THEN
+        v_amount := (p_payment->>'amount')::NUMERIC;
+
+        INSERT INTO public.payments (
+            invoice_id, amount, payment_method, reference_note, recorded_by
+        )
+        VALUES (
+            v_invoice.id, v_amount, p_payment->>'payment_method',
+            p_payment->>'reference_note', p_user_id
+        );
+
+        UPDATE public.invoices
+        SET amount_paid = v_amount,
+            balance_due = GREATEST(0, total - v_amount),
+            status = CASE WHEN total - v_amount <= 0 THEN 'PAID' ELSE 'PARTIALLY_PAID' END::public.invoice_status,
+            paid_at = CASE WHEN total - v_amount <= 0 THEN NOW() ELSE paid_at END
+        WHERE id = v_invoice.id;
+    END IF;
+
+    SELECT * INTO v_invoice FROM public.invoices WHERE id = v_invoice.id;
+    RETURN v_invoice;
+END;
+$$ LANGUAGE plpgsql SET search_path = '';
@@ -0,0 +1,19 @@
+-- Migration 031: Resolve a user id from an email address
+-- Run this in Supabase SQL editor
+--
+-- scripts/import_invoice_sale.py found the attributing user by listing
+-- every auth user through the admin API and scanning for the email.
+-- get_user_id_by_email reads the single matching auth.users row instead.
+-- It runs as SECURITY DEFINER to reach the auth schema, so execution is
+-- limited to the service role; emails can't be probed with public keys.
+
+CREATE OR REPLACE FUNCTION public.get_user_id_by_email(p_email TEXT)
+RETURNS UUID AS $$
+    SELECT u.id
+    FROM auth.users u
+    WHERE u.email = p_email
+    LIMIT 1;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = '';
+
+REVOKE EXECUTE ON FUNCTION public.get_user_id_by_email(TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.get_user_id_by_email(TEXT) TO service_role;
@@ -0,0 +1,63 @@
+-- Migration 032: Atomic bulk purchase import
+-- Run this in Supabase SQL editor
+--
+-- scripts/import_purchases.py created the purchase batch, read stock,
+-- wrote new levels and inserted RESTOCK transactions as separate
+-- requests, so a failure part way through left stock, ledger and batch
+-- out of step. import_purchase_batch takes the whole import as JSONB
+--   p_items  [{"product_id": "...", "quantity": 3, "unit_price": 120.00,
+--              "reference_note": "..."}, ...]
+--   p_batch  {"po_number", "vendor_bill_number", "vendor_name", "bill_date"}
+--            or NULL for an import without batch metadata
+-- and, in one transaction, creates the batch, records a RESTOCK per item
+-- (linked to the batch) and adds the quantities to stock with a single
+-- INSERT ... ON CONFLICT DO UPDATE (summed per product first, as in
+-- reconcile_inventory). Returns the resulting quantity_on_hand per product
+-- along with the new batch id (NULL without p_batch).
+
+-- Earlier revision of this migration took an existing batch id
+DROP FUNCTION IF EXISTS public.import_purchase_batch(UUID, JSONB, UUID);
+
+CREATE OR REPLACE FUNCTION public.import_purchase_batch(
+    p_warehouse_id UUID,
+    p_items JSONB,
+    p_batch JSONB DEFAULT NULL
+) RETURNS TABLE(product_id UUID, quantity_on_hand INTEGER, batch_id UUID) AS $$
+DECLARE
+    v_batch_id UUID;
+BEGIN
+    IF p_batch IS NOT NULL THEN
+        INSERT INTO public.purchase_batches (po_number, vendor_bill_number, vendor_name, bill_date)
+        VALUES (
+            p_batch->>'po_number',
+            p_batch->>'vendor_bill_number',
+            p_batch->>'vendor_name',
+            (p_batch->>'bill_date')::DATE
+        )
+        RETURNING id INTO v_batch_id;
+    END IF;
+
+    INSERT INTO public.transactions (
+        transaction_type, product_id, to_warehouse_id,
+        quantity, unit_price, reference_note, batch_id
+    )
+    SELECT
+        'RESTOCK'::public.transaction_type,
+        (elem->>'product_id')::UUID,
+        p_warehouse_id,
+        (elem->>'quantity')::INTEGER,
+        (elem->>'unit_price')::NUMERIC,
+        elem->>'reference_note',
+        v_batch_id
+    FROM jsonb_array_elements(p_items) AS elem;
+
+    RETURN QUERY
+    INSERT INTO public.inventory_items AS inv (warehouse_id, product_id, quantity_on_hand)
+    SELECT p_warehouse_id, (elem->>'product_id')::UUID, SUM((elem->>'quantity')::INTEGER)::INTEGER
+    FROM jsonb_array_elements(p_items) AS elem
+    GROUP BY (elem->>'product_id')::UUID
+    ON CONFLICT ON CONSTRAINT unique_warehouse_product DO UPDATE
+    SET quantity_on_hand = inv.quantity_on_hand + EXCLUDED.quantity_on_hand
+    RETURNING inv.product_id, inv.quantity_on_hand, v_batch_id;
+END;
+$$ LANGUAGE plpgsql SET search_path = '';
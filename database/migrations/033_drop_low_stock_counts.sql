@@ -0,0 +1,18 @@
+-- Migration 033: Drop the trigger-maintained low-stock counter
+-- Run this in Supabase SQL editor
+--
+-- Migration 016 kept one warehouse_low_stock_counts row per warehouse,
+-- updated by a trigger whenever an inventory row entered or left the
+-- low-stock band. Every such change wrote the same shared row, and a
+-- transfer touched the rows of both warehouses, so concurrent transfers in
+-- opposite directions (A -> B and B -> A) could lock them in opposite order
+-- and deadlock. The partial index from migration 015 already makes
+--   COUNT(*) WHERE warehouse_id = ? AND quantity_on_hand < 5
+-- an index-only scan over just the low-stock rows, so the endpoint counts
+-- through it again and the counter is removed.
+
+DROP TRIGGER IF EXISTS sync_inventory_low_stock_count ON public.inventory_items;
+
+DROP FUNCTION IF EXISTS public.sync_low_stock_count();
+
+DROP TABLE IF EXISTS public.warehouse_low_stock_counts;
@@ -1,5 +1,6 @@
 import { NextResponse } from "next/server";
 import { getUserFromRequest, createServiceClient } from "@/lib/supabase-server";
+import { getCachedBrands } from "@/lib/cache";
 
 export async function GET() {
   const { user, error } = await getUserFromRequest();
@@ -9,12 +10,8 @@ export async function GET() {
   }
 
   const supabase = createServiceClient();
-  const { data } = await supabase.from("products").select("brand");
-
-  // Deduplicate and sort
-  const brands = [
-    ...new Set((data || []).map((row) => row.brand).filter(Boolean)),
-  ].sort();
+  // Distinct, sorted brand list computed in the database (cached for 30s)
+  const brands = await getCachedBrands(supabase);
 
   return NextResponse.json({ brands });
 }
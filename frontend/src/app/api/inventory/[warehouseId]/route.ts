@@ -4,17 +4,18 @@ import {
   createServiceClient,
   requireWarehouseAccess,
 } from "@/lib/supabase-server";
+import { getCachedWarehouse } from "@/lib/cache";
 
 interface Product {
   id: string;
   sku: string;
   name: string;
   brand: string;
-  category?: string;
-  image_url?: string;
-  retail_price?: number;
-  wholesale_price?: number;
-  cost_price?: number;
+  category: string | null;
+  image_url: string | null;
+  retail_price: number | null;
+  wholesale_price: number | null;
+  cost_price: number | null;
 }
 
 interface InventoryItem {
@@ -22,7 +23,37 @@ interface InventoryItem {
   warehouse_id: string;
   product_id: string;
   quantity_on_hand: number;
-  products?: Product;
+  product: Product | null;
+}
+
+const PRODUCT_COLUMNS =
+  "id, sku, name, brand, category, image_url, retail_price, wholesale_price, cost_price";
+
+/**
+ * Normalize an inventory row for the response. Empty optional fields and
+ * zero prices are returned as null ("no price"), as the API always has.
+ */
+function toInventoryResponse(item: InventoryItem): InventoryItem {
+  const product = item.product;
+  return {
+    id: item.id,
+    warehouse_id: item.warehouse_id,
+    product_id: item.product_id,
+    quantity_on_hand: item.quantity_on_hand,
+    product: product
+      ? {
+          id: product.id,
+          sku: product.sku,
+          name: product.name,
+          brand: product.brand,
+          category: product.category || null,
+          image_url: product.image_url || null,
+          retail_price: product.retail_price || null,
+          wholesale_price: product.wholesale_price || null,
+          cost_price: product.cost_price || null,
+        }
+      : null,
+  };
 }
 
 export async function GET(
@@ -51,68 +82,30 @@ export async function GET(
   const brand = searchParams.get("brand");
   const sort = searchParams.get("sort");
 
-  // Get warehouse info
-  const { data: warehouse, error: warehouseError } = await supabase
-    .from("warehouses")
-    .select("*")
-    .eq("id", warehouseId)
-    .single();
-
-  if (warehouseError || !warehouse) {
-    return NextResponse.json({ detail: "Warehouse not found" }, { status: 404 });
-  }
-
-  // Pre-filter: collect product IDs matching search and/or brand
-  let productIds: string[] | null = null;
+  // Base query. The product embed is aliased to "product" so rows come back
+  // in the response shape and only need null-normalizing. Search and brand
+  // filter on the embedded product; !inner turns the embed into an inner
+  // join so non-matching rows are dropped (and excluded from the count) by
+  // the database in the same request.
+  const productsEmbed = search || brand ? "product:products!inner" : "product:products";
+  let query = supabase
+    .from("inventory_items")
+    .select(
+      `id, warehouse_id, product_id, quantity_on_hand, ${productsEmbed}(${PRODUCT_COLUMNS})`,
+      { count: "exact" }
+    )
+    .eq("warehouse_id", warehouseId);
 
   if (search) {
     const searchTerm = `%${search}%`;
-    const { data: searchData } = await supabase
-      .from("products")
-      .select("id")
-      .or(`sku.ilike.${searchTerm},name.ilike.${searchTerm},brand.ilike.${searchTerm}`);
-
-    productIds = (searchData || []).map((p) => p.id);
+    query = query.or(
+      `sku.ilike.${searchTerm},name.ilike.${searchTerm},brand.ilike.${searchTerm}`,
+      { referencedTable: "product" }
+    );
   }
 
   if (brand) {
-    const { data: brandData } = await supabase
-      .from("products")
-      .select("id")
-      .eq("brand", brand);
-
-    const brandIds = new Set((brandData || []).map((p) => p.id));
-
-    if (productIds !== null) {
-      // Intersect with search results
-      productIds = productIds.filter((id) => brandIds.has(id));
-    } else {
-      productIds = [...brandIds];
-    }
-  }
-
-  // Return empty if filters matched nothing
-  if (productIds !== null && productIds.length === 0) {
-    return NextResponse.json({
-      warehouse_id: warehouseId,
-      warehouse_name: warehouse.name,
-      items: [],
-      total_items: 0,
-      page,
-      page_size: pageSize,
-      low_stock_count: 0,
-    });
-  }
-
-  // Base query
-  let query = supabase
-    .from("inventory_items")
-    .select("*, products(*)", { count: "exact" })
-    .eq("warehouse_id", warehouseId);
-
-  // Apply product filter if searching
-  if (productIds !== null) {
-    query = query.in("product_id", productIds);
+    query = query.eq("product.brand", brand);
   }
 
   // Apply ordering by quantity when sort is set
@@ -126,42 +119,32 @@ export async function GET(
   const start = (page - 1) * pageSize;
   const end = start + pageSize - 1;
 
-  const { data: inventoryData, count } = await query.range(start, end);
-
-  // Separate query for low stock count (global for this warehouse)
-  const { count: lowStockCount } = await supabase
-    .from("inventory_items")
-    .select("*", { count: "exact", head: true })
-    .eq("warehouse_id", warehouseId)
-    .lt("quantity_on_hand", 5);
-
-  const items = (inventoryData as InventoryItem[] || []).map((item) => {
-    const product = item.products;
-    return {
-      id: item.id,
-      warehouse_id: item.warehouse_id,
-      product_id: item.product_id,
-      quantity_on_hand: item.quantity_on_hand,
-      product: product
-        ? {
-            id: product.id,
-            sku: product.sku,
-            name: product.name,
-            brand: product.brand,
-            category: product.category || null,
-            image_url: product.image_url || null,
-            retail_price: product.retail_price || null,
-            wholesale_price: product.wholesale_price || null,
-            cost_price: product.cost_price || null,
-          }
-        : null,
-    };
-  });
+  // Warehouse info, the inventory page and the low stock count (global for
+  // this warehouse) are independent: fetch together. The count is served by
+  // the partial index idx_inventory_low_stock (migration 015), whose
+  // predicate must stay in step with the .lt() threshold below.
+  const [
+    warehouse,
+    { data: inventoryData, count },
+    { count: lowStockCount },
+  ] = await Promise.all([
+    getCachedWarehouse(supabase, warehouseId),
+    query.range(start, end),
+    supabase
+      .from("inventory_items")
+      .select("id", { count: "exact", head: true })
+      .eq("warehouse_id", warehouseId)
+      .lt("quantity_on_hand", 5),
+  ]);
+
+  if (!warehouse) {
+    return NextResponse.json({ detail: "Warehouse not found" }, { status: 404 });
+  }
 
   return NextResponse.json({
     warehouse_id: warehouseId,
     warehouse_name: warehouse.name,
-    items,
+    items: ((inventoryData as InventoryItem[]) || []).map(toInventoryResponse),
     total_items: count || 0,
     page,
     page_size: pageSize,
@@ -6,11 +6,11 @@ interface Product {
   sku: string;
   name: string;
   brand: string;
-  category?: string;
-  image_url?: string;
-  retail_price?: number;
-  wholesale_price?: number;
-  cost_price?: number;
+  category: string | null;
+  image_url: string | null;
+  retail_price: number | null;
+  wholesale_price: number | null;
+  cost_price: number | null;
 }
 
 interface InventoryItem {
@@ -18,7 +18,7 @@ interface InventoryItem {
   warehouse_id: string;
   product_id: string;
   quantity_on_hand: number;
-  products?: Product;
+  product: Product | null;
 }
 
 interface Warehouse {
@@ -26,6 +26,37 @@ interface Warehouse {
   name: string;
 }
 
+// Rows requested per page. PostgREST may cap pages lower (max-rows), so
+// paging advances by the rows actually returned and stops on an empty page.
+const INVENTORY_PAGE_SIZE = 1000;
+
+/**
+ * Normalize an inventory row for the response. Empty optional fields and
+ * zero prices are returned as null ("no price"), as the API always has.
+ */
+function toInventoryResponse(item: InventoryItem): InventoryItem {
+  const product = item.product;
+  return {
+    id: item.id,
+    warehouse_id: item.warehouse_id,
+    product_id: item.product_id,
+    quantity_on_hand: item.quantity_on_hand,
+    product: product
+      ? {
+          id: product.id,
+          sku: product.sku,
+          name: product.name,
+          brand: product.brand,
+          category: product.category || null,
+          image_url: product.image_url || null,
+          retail_price: product.retail_price || null,
+          wholesale_price: product.wholesale_price || null,
+          cost_price: product.cost_price || null,
+        }
+      : null,
+  };
+}
+
 export async function GET() {
   const { user, error } = await getUserFromRequest();
   if (error) return error;
@@ -36,7 +67,7 @@ export async function GET() {
   const supabase = createServiceClient();
 
   // Get warehouses user has access to
-  let warehousesQuery = supabase.from("warehouses").select("*");
+  let warehousesQuery = supabase.from("warehouses").select("id, name");
 
   if (user.role !== "admin" && user.role !== "viewer") {
     if (!user.warehouseId) {
@@ -47,42 +78,54 @@ export async function GET() {
 
   const { data: warehouses } = await warehousesQuery;
 
-  const results = [];
+  const warehouseList = (warehouses as Warehouse[]) || [];
+  if (warehouseList.length === 0) {
+    return NextResponse.json([]);
+  }
 
-  for (const warehouse of (warehouses as Warehouse[]) || []) {
-    // Get inventory for this warehouse
-    const { data: inventoryData } = await supabase
+  // Fetch inventory for every accessible warehouse in one query, paging
+  // through PostgREST's max-rows cap, then group by warehouse in memory.
+  // A failed page fails the whole response rather than silently dropping
+  // warehouses (and skewing their low-stock counts).
+  // The product embed is aliased to "product" so rows are already in the
+  // response shape apart from null-normalizing.
+  const warehouseIds = warehouseList.map((w) => w.id);
+  const inventoryData: InventoryItem[] = [];
+  for (let start = 0; ; ) {
+    const { data: pageData, error: pageError } = await supabase
       .from("inventory_items")
-      .select("*, products(*)")
-      .eq("warehouse_id", warehouse.id);
+      .select(
+        "id, warehouse_id, product_id, quantity_on_hand, product:products(id, sku, name, brand, category, image_url, retail_price, wholesale_price, cost_price)"
+      )
+      .in("warehouse_id", warehouseIds)
+      .order("id")
+      .range(start, start + INVENTORY_PAGE_SIZE - 1);
+
+    if (pageError) {
+      return NextResponse.json({ detail: pageError.message }, { status: 500 });
+    }
+
+    const rows = (pageData as InventoryItem[]) || [];
+    if (rows.length === 0) break;
+    inventoryData.push(...rows.map(toInventoryResponse));
+    start += rows.length;
+  }
+
+  const itemsByWarehouse: Record<string, InventoryItem[]> = {};
+  for (const item of inventoryData) {
+    (itemsByWarehouse[item.warehouse_id] ??= []).push(item);
+  }
+
+  const results = [];
 
+  for (const warehouse of warehouseList) {
+    const items = itemsByWarehouse[warehouse.id] || [];
     let lowStockCount = 0;
-    const items = ((inventoryData as InventoryItem[]) || []).map((item) => {
+    for (const item of items) {
       if (item.quantity_on_hand < 5) {
         lowStockCount++;
       }
-
-      const product = item.products;
-      return {
-        id: item.id,
-        warehouse_id: item.warehouse_id,
-        product_id: item.product_id,
-        quantity_on_hand: item.quantity_on_hand,
-        product: product
-          ? {
-              id: product.id,
-              sku: product.sku,
-              name: product.name,
-              brand: product.brand,
-              category: product.category || null,
-              image_url: product.image_url || null,
-              retail_price: product.retail_price || null,
-              wholesale_price: product.wholesale_price || null,
-              cost_price: product.cost_price || null,
-            }
-          : null,
-      };
-    });
+    }
 
     results.push({
       warehouse_id: warehouse.id,
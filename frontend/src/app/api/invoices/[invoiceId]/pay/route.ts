@@ -46,7 +46,7 @@ export async function POST(
     .select("id, warehouse_id, status, total, amount_paid, balance_due")
     .eq("id", invoiceId)
     .is("deleted_at", null)
-    .single();
+    .maybeSingle();
 
   if (!invoice) {
     return NextResponse.json({ detail: "Invoice not found" }, { status: 404 });
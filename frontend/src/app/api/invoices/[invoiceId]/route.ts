@@ -24,7 +24,7 @@ export async function GET(
     .select("*")
     .eq("id", invoiceId)
     .is("deleted_at", null)
-    .single();
+    .maybeSingle();
 
   if (invoiceError || !invoice) {
     return NextResponse.json({ detail: "Invoice not found" }, { status: 404 });
@@ -33,38 +33,39 @@ export async function GET(
   const accessError = requireWarehouseAccess(user, invoice.warehouse_id);
   if (accessError) return accessError;
 
-  const { data: invoiceItems } = await supabase
-    .from("invoice_items")
-    .select(`
-      id,
-      product_id,
-      quantity,
-      unit_price,
-      line_total,
-      products (
+  // Line items and payments are independent: fetch together
+  const [{ data: invoiceItems }, { data: payments }] = await Promise.all([
+    supabase
+      .from("invoice_items")
+      .select(`
         id,
-        sku,
-        name,
-        brand,
-        retail_price,
-        wholesale_price,
-        cost_price
-      )
-    `)
-    .eq("invoice_id", invoiceId);
+        product_id,
+        quantity,
+        unit_price,
+        line_total,
+        products (
+          id,
+          sku,
+          name,
+          brand,
+          retail_price,
+          wholesale_price,
+          cost_price
+        )
+      `)
+      .eq("invoice_id", invoiceId),
+    supabase
+      .from("payments")
+      .select("id, amount, payment_method, reference_note, recorded_by, created_at")
+      .eq("invoice_id", invoiceId)
+      .order("created_at", { ascending: true }),
+  ]);
 
   const items = (invoiceItems || []).map((item: { products?: object }) => ({
     ...item,
     product: item.products ?? null,
   }));
 
-  // Fetch payments for this invoice
-  const { data: payments } = await supabase
-    .from("payments")
-    .select("id, amount, payment_method, reference_note, recorded_by, created_at")
-    .eq("invoice_id", invoiceId)
-    .order("created_at", { ascending: true });
-
   return NextResponse.json({
     ...invoice,
     items,
@@ -91,7 +92,7 @@ export async function PATCH(
     .select("id, warehouse_id, status")
     .eq("id", invoiceId)
     .is("deleted_at", null)
-    .single();
+    .maybeSingle();
 
   if (!existing) {
     return NextResponse.json({ detail: "Invoice not found" }, { status: 404 });
@@ -24,7 +24,7 @@ export async function POST(
     .select("id, warehouse_id, status")
     .eq("id", invoiceId)
     .is("deleted_at", null)
-    .single();
+    .maybeSingle();
 
   if (!invoice) {
     return NextResponse.json({ detail: "Invoice not found" }, { status: 404 });
@@ -3,6 +3,7 @@ import {
   getUserFromRequest,
   createServiceClient,
 } from "@/lib/supabase-server";
+import { getCachedWarehouse } from "@/lib/cache";
 
 export async function GET() {
   const { user, error } = await getUserFromRequest();
@@ -14,16 +15,11 @@ export async function GET() {
   // Get warehouse name if user has one
   let warehouseName: string | null = null;
   if (user.warehouseId) {
-    const supabase = createServiceClient();
-    const { data } = await supabase
-      .from("warehouses")
-      .select("name")
-      .eq("id", user.warehouseId)
-      .single();
-
-    if (data) {
-      warehouseName = data.name;
-    }
+    const warehouse = await getCachedWarehouse(
+      createServiceClient(),
+      user.warehouseId
+    );
+    warehouseName = warehouse?.name ?? null;
   }
 
   return NextResponse.json({
@@ -22,39 +22,43 @@ export async function GET(
 
   const supabase = createServiceClient();
 
-  const { data: batch, error: batchError } = await supabase
-    .from("purchase_batches")
-    .select("*")
-    .eq("id", batchId)
-    .single();
+  // The batch and its restock lines are fetched together; the line query
+  // returns nothing if the batch doesn't exist
+  const [{ data: batch, error: batchError }, { data: transactions }] =
+    await Promise.all([
+      supabase
+        .from("purchase_batches")
+        .select("*")
+        .eq("id", batchId)
+        .maybeSingle(),
+      supabase
+        .from("transactions")
+        .select(`
+          id,
+          product_id,
+          quantity,
+          unit_price,
+          reference_note,
+          created_at,
+          products (
+            id,
+            sku,
+            name,
+            brand,
+            retail_price,
+            wholesale_price,
+            cost_price
+          )
+        `)
+        .eq("transaction_type", "RESTOCK")
+        .eq("batch_id", batchId)
+        .order("created_at", { ascending: true }),
+    ]);
 
   if (batchError || !batch) {
     return NextResponse.json({ detail: "Batch not found" }, { status: 404 });
   }
 
-  const { data: transactions } = await supabase
-    .from("transactions")
-    .select(`
-      id,
-      product_id,
-      quantity,
-      unit_price,
-      reference_note,
-      created_at,
-      products (
-        id,
-        sku,
-        name,
-        brand,
-        retail_price,
-        wholesale_price,
-        cost_price
-      )
-    `)
-    .eq("transaction_type", "RESTOCK")
-    .eq("batch_id", batchId)
-    .order("created_at", { ascending: true });
-
   const items = (transactions || []).map((t: Record<string, unknown>) => ({
     id: t.id,
     product_id: t.product_id,
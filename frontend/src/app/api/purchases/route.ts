@@ -45,68 +45,40 @@ export async function POST(request: NextRequest) {
 
   const supabase = createServiceClient();
 
-  // Validate warehouse exists
-  const { data: warehouses } = await supabase
-    .from("warehouses")
-    .select("id, name")
-    .eq("id", warehouse_id);
-
-  if (!warehouses || warehouses.length === 0) {
-    return NextResponse.json({ detail: "Warehouse not found" }, { status: 404 });
-  }
-
-  // Validate product exists and fetch cost info
-  const { data: products } = await supabase
-    .from("products")
-    .select("id, name, cost_price")
-    .eq("id", product_id);
-
-  if (!products || products.length === 0) {
-    return NextResponse.json({ detail: "Product not found" }, { status: 404 });
-  }
-
-  const product = products[0];
-
-  // Determine final cost
-  const finalUnitCost = unit_cost ?? product.cost_price;
-
+  // record_purchase validates warehouse and product, defaults the cost to
+  // the product's cost price, and returns the new stock level
   try {
-    const { data: transactionId, error: rpcError } = await supabase.rpc(
+    const { data: result, error: rpcError } = await supabase.rpc(
       "record_purchase",
       {
         p_warehouse_id: warehouse_id,
         p_product_id: product_id,
         p_quantity: quantity,
-        p_unit_cost: finalUnitCost,
+        p_unit_cost: unit_cost ?? null,
         p_note: reference_note || null,
         p_user_id: user.userId,
         p_batch_id: batch_id || null,
       }
     );
 
-    if (rpcError || !transactionId) {
+    if (rpcError || !result || result.length === 0) {
       const errMsg = rpcError?.message ?? "Failed to record purchase";
-      return NextResponse.json({ detail: errMsg }, { status: 400 });
+      return NextResponse.json(
+        { detail: errMsg },
+        { status: rpcError?.code === "P0002" ? 404 : 400 }
+      );
     }
 
-    const { data: inventoryData } = await supabase
-      .from("inventory_items")
-      .select("quantity_on_hand")
-      .eq("warehouse_id", warehouse_id)
-      .eq("product_id", product_id)
-      .single();
-
-    const newStock = inventoryData?.quantity_on_hand ?? quantity;
-
+    const row = Array.isArray(result) ? result[0] : result;
     return NextResponse.json({
       success: true,
-      message: `Purchase recorded: ${quantity} x ${product.name}`,
-      transaction_id: transactionId,
+      message: `Purchase recorded: ${quantity} x ${row.product_name}`,
+      transaction_id: row.transaction_id,
       warehouse_id,
       product_id,
       quantity,
-      unit_cost: finalUnitCost,
-      new_stock_level: newStock,
+      unit_cost: row.unit_price,
+      new_stock_level: row.new_stock_level,
     });
   } catch (err) {
     console.error("Purchase error:", err);
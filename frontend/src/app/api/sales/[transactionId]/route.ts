@@ -31,7 +31,7 @@ export async function DELETE(
     .from("transactions")
     .select("id, transaction_type, from_warehouse_id, invoice_id, deleted_at")
     .eq("id", transactionId)
-    .single();
+    .maybeSingle();
 
   if (!transaction) {
     return NextResponse.json(
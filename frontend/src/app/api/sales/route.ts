@@ -44,80 +44,39 @@ export async function POST(request: NextRequest) {
 
   const supabase = createServiceClient();
 
-  // Validate warehouse exists
-  const { data: warehouse, error: warehouseError } = await supabase
-    .from("warehouses")
-    .select("id, name")
-    .eq("id", warehouse_id)
-    .single();
-
-  if (warehouseError || !warehouse) {
-    return NextResponse.json({ detail: "Warehouse not found" }, { status: 404 });
-  }
-
-  // Validate product exists and fetch pricing info
-  const { data: product, error: productError } = await supabase
-    .from("products")
-    .select("id, name, retail_price, cost_price")
-    .eq("id", product_id)
-    .single();
-
-  if (productError || !product) {
-    return NextResponse.json({ detail: "Product not found" }, { status: 404 });
-  }
-
-  // Determine final sale price
-  const finalUnitPrice = unit_price ?? product.retail_price;
-
-  // Get current stock for response (validation happens in RPC)
-  const { data: inventory } = await supabase
-    .from("inventory_items")
-    .select("quantity_on_hand")
-    .eq("warehouse_id", warehouse_id)
-    .eq("product_id", product_id)
-    .single();
-
-  const currentStock = inventory?.quantity_on_hand ?? 0;
-  if (currentStock < quantity) {
-    return NextResponse.json(
-      {
-        detail: `Insufficient stock. Available: ${currentStock}, Requested: ${quantity}`,
-      },
-      { status: 400 }
-    );
-  }
-
+  // record_sale validates warehouse, product and stock, defaults the price
+  // to the product's retail price, and returns the new stock level
   try {
-    const { data: transactionId, error: rpcError } = await supabase.rpc(
+    const { data: result, error: rpcError } = await supabase.rpc(
       "record_sale",
       {
         p_warehouse_id: warehouse_id,
         p_product_id: product_id,
         p_quantity: quantity,
-        p_unit_price: finalUnitPrice,
+        p_unit_price: unit_price ?? null,
         p_note: reference_note || null,
         p_user_id: user.userId,
       }
     );
 
-    if (rpcError || !transactionId) {
+    if (rpcError || !result || result.length === 0) {
       const errMsg = rpcError?.message ?? "Failed to record sale";
       return NextResponse.json(
         { detail: errMsg },
-        { status: 400 }
+        { status: rpcError?.code === "P0002" ? 404 : 400 }
       );
     }
 
-    const newStock = currentStock - quantity;
+    const row = Array.isArray(result) ? result[0] : result;
     return NextResponse.json({
       success: true,
-      message: `Sale recorded: ${quantity} x ${product.name}`,
-      transaction_id: transactionId,
+      message: `Sale recorded: ${quantity} x ${row.product_name}`,
+      transaction_id: row.transaction_id,
       warehouse_id,
       product_id,
       quantity,
-      unit_price: finalUnitPrice,
-      new_stock_level: newStock,
+      unit_price: row.unit_price,
+      new_stock_level: row.new_stock_level,
     });
   } catch (err) {
     console.error("Sale error:", err);
@@ -4,6 +4,13 @@ import {
   createServiceClient,
   requireWarehouseAccess,
 } from "@/lib/supabase-server";
+import { getCachedWarehouse } from "@/lib/cache";
+import { isIsoTimestamp, isUuid } from "@/lib/utils";
+
+// Embeds are aliased to the response field names, so rows only need
+// null-normalizing (toTransactionResponse) before they are returned
+const TRANSACTION_SELECT =
+  "id, transaction_type, product_id, from_warehouse_id, to_warehouse_id, quantity, unit_price, reference_note, created_by, created_at, product:products(id, sku, name, brand, category, retail_price), from_warehouse:warehouses!from_warehouse_id(id, name, manager_id), to_warehouse:warehouses!to_warehouse_id(id, name, manager_id)";
 
 const VALID_TRANSACTION_TYPES = [
   "SALE",
@@ -18,28 +25,74 @@ interface Product {
   sku: string;
   name: string;
   brand: string;
-  category?: string;
-  retail_price?: number;
+  category: string | null;
+  retail_price: number | null;
 }
 
 interface Warehouse {
   id: string;
   name: string;
-  manager_id?: string;
+  manager_id: string | null;
 }
 
 interface Transaction {
   id: string;
   transaction_type: string;
   product_id: string;
-  from_warehouse_id?: string;
-  to_warehouse_id?: string;
+  from_warehouse_id: string | null;
+  to_warehouse_id: string | null;
   quantity: number;
-  unit_price?: number;
-  reference_note?: string;
-  created_by?: string;
+  unit_price: number | null;
+  reference_note: string | null;
+  created_by: string | null;
   created_at: string;
-  products?: Product;
+  product: Product | null;
+  from_warehouse: Warehouse | null;
+  to_warehouse: Warehouse | null;
+}
+
+/**
+ * Normalize a transaction row for the response. Empty optional fields and
+ * zero prices are returned as null ("no price"), as the API always has.
+ */
+function toTransactionResponse(t: Transaction): Transaction {
+  const { product, from_warehouse: fromWarehouse, to_warehouse: toWarehouse } = t;
+  return {
+    id: t.id,
+    transaction_type: t.transaction_type,
+    product_id: t.product_id,
+    from_warehouse_id: t.from_warehouse_id || null,
+    to_warehouse_id: t.to_warehouse_id || null,
+    quantity: t.quantity,
+    unit_price: t.unit_price || null,
+    reference_note: t.reference_note || null,
+    created_by: t.created_by || null,
+    created_at: t.created_at,
+    product: product
+      ? {
+          id: product.id,
+          sku: product.sku,
+          name: product.name,
+          brand: product.brand,
+          category: product.category || null,
+          retail_price: product.retail_price || null,
+        }
+      : null,
+    from_warehouse: fromWarehouse
+      ? {
+          id: fromWarehouse.id,
+          name: fromWarehouse.name,
+          manager_id: fromWarehouse.manager_id || null,
+        }
+      : null,
+    to_warehouse: toWarehouse
+      ? {
+          id: toWarehouse.id,
+          name: toWarehouse.name,
+          manager_id: toWarehouse.manager_id || null,
+        }
+      : null,
+  };
 }
 
 export async function GET(
@@ -60,17 +113,6 @@ export async function GET(
 
   const supabase = createServiceClient();
 
-  // Validate warehouse exists
-  const { data: warehouse, error: warehouseError } = await supabase
-    .from("warehouses")
-    .select("id")
-    .eq("id", warehouseId)
-    .single();
-
-  if (warehouseError || !warehouse) {
-    return NextResponse.json({ detail: "Warehouse not found" }, { status: 404 });
-  }
-
   // Get query params
   const searchParams = request.nextUrl.searchParams;
   const transactionType = searchParams.get("transaction_type");
@@ -81,6 +123,9 @@ export async function GET(
     parseInt(searchParams.get("page_size") || "50", 10),
     100
   );
+  // Keyset cursor: the created_at and id of the last row on the previous page
+  const before = searchParams.get("before");
+  const beforeId = searchParams.get("before_id");
 
   // Validate transaction type if provided
   if (transactionType && !VALID_TRANSACTION_TYPES.includes(transactionType)) {
@@ -90,163 +135,143 @@ export async function GET(
     );
   }
 
-  // If brand filter is provided, resolve matching product IDs first
-  let brandProductIds: string[] | null = null;
-  if (brand) {
-    const { data: brandData } = await supabase
-      .from("products")
-      .select("id")
-      .eq("brand", brand);
+  // Both cursor values are interpolated into a PostgREST filter, so they are
+  // checked strictly rather than with Date.parse (which accepts free text)
+  if (
+    (before && !isIsoTimestamp(before)) ||
+    (beforeId && (!before || !isUuid(beforeId)))
+  ) {
+    return NextResponse.json(
+      { detail: "Invalid cursor. before must be an ISO-8601 timestamp and before_id a UUID sent with before" },
+      { status: 400 }
+    );
+  }
+
+  // Validate warehouse exists and, if a brand filter is provided, resolve
+  // matching product IDs first. The two lookups are independent.
+  const [warehouse, brandResult] = await Promise.all([
+    getCachedWarehouse(supabase, warehouseId),
+    brand
+      ? supabase.from("products").select("id").eq("brand", brand)
+      : Promise.resolve(null),
+  ]);
+
+  if (!warehouse) {
+    return NextResponse.json({ detail: "Warehouse not found" }, { status: 404 });
+  }
 
-    brandProductIds = (brandData || []).map((p) => p.id);
+  let brandProductIds: string[] | null = null;
+  if (brandResult) {
+    brandProductIds = (brandResult.data || []).map((p) => p.id);
     if (brandProductIds.length === 0) {
       return NextResponse.json({
         items: [],
         total: 0,
         page,
         page_size: pageSize,
+        next_before: null,
+        next_before_id: null,
       });
     }
   }
 
-  // Build warehouse filter based on transaction type direction:
-  // - TRANSFER_OUT / SALE: warehouse is the source (from_warehouse_id)
-  // - TRANSFER_IN / RESTOCK: warehouse is the destination (to_warehouse_id)
-  // - ADJUSTMENT: warehouse is the source (from_warehouse_id)
-  // - No type filter: show all transactions involving the warehouse in either direction
-  // Note: Generic removed to avoid "Type instantiation is excessively deep" with Supabase query builder
-  const transactionsBase = supabase.from("transactions").select("*, products(*)");
-  let query = !transactionType
-    ? transactionsBase.or(`from_warehouse_id.eq.${warehouseId},to_warehouse_id.eq.${warehouseId}`)
-    : transactionType === "TRANSFER_OUT" || transactionType === "SALE" || transactionType === "ADJUSTMENT"
-      ? transactionsBase.eq("from_warehouse_id", warehouseId)
-      : transactionType === "TRANSFER_IN" || transactionType === "RESTOCK"
-        ? transactionsBase.eq("to_warehouse_id", warehouseId)
-        : transactionsBase.or(`from_warehouse_id.eq.${warehouseId},to_warehouse_id.eq.${warehouseId}`);
-
-  // Filter by type if specified
-  if (transactionType) {
-    query = query.eq("transaction_type", transactionType);
-  }
-
-  // Apply brand filter
-  if (brandProductIds !== null) {
-    query = query.in("product_id", brandProductIds);
-  }
-
-  // Exclude invoice-linked sales when requested (for On-the-Spot tab)
-  if (transactionType === "SALE" && excludeInvoiced) {
-    query = query.is("invoice_id", null);
-  }
-
-  // Exclude soft-deleted transactions
-  query = query.is("deleted_at", null);
-
-  // Get total count (mirrors all filters)
-  const countBase = supabase.from("transactions").select("id", { count: "exact" });
-  let countQuery = !transactionType
-    ? countBase.or(`from_warehouse_id.eq.${warehouseId},to_warehouse_id.eq.${warehouseId}`)
-    : transactionType === "TRANSFER_OUT" || transactionType === "SALE" || transactionType === "ADJUSTMENT"
-      ? countBase.eq("from_warehouse_id", warehouseId)
-      : transactionType === "TRANSFER_IN" || transactionType === "RESTOCK"
-        ? countBase.eq("to_warehouse_id", warehouseId)
-        : countBase.or(`from_warehouse_id.eq.${warehouseId},to_warehouse_id.eq.${warehouseId}`);
-
-  if (transactionType) {
-    countQuery = countQuery.eq("transaction_type", transactionType);
-  }
-
-  if (brandProductIds !== null) {
-    countQuery = countQuery.in("product_id", brandProductIds);
-  }
-
-  if (transactionType === "SALE" && excludeInvoiced) {
-    countQuery = countQuery.is("invoice_id", null);
-  }
-
-  countQuery = countQuery.is("deleted_at", null);
-
-  const { count: total } = await countQuery;
-
-  // Apply pagination and ordering
   const offset = (page - 1) * pageSize;
-  query = query.order("created_at", { ascending: false }).range(offset, offset + pageSize - 1);
 
-  const { data: transactions } = await query;
+  let transactions: unknown[] | null;
+  let total: number | null;
+
+  if (!transactionType) {
+    // All transactions involving the warehouse in either direction. A
+    // from_warehouse_id = X OR to_warehouse_id = X filter can't use the
+    // per-direction indexes, so list_warehouse_transactions does a UNION ALL
+    // of one index scan per direction. The total comes from a concurrent
+    // estimated count over the same filter.
+    let countQuery = supabase
+      .from("transactions")
+      .select("id", { count: "estimated", head: true })
+      .or(`from_warehouse_id.eq.${warehouseId},to_warehouse_id.eq.${warehouseId}`)
+      .is("deleted_at", null);
+    if (brandProductIds !== null) {
+      countQuery = countQuery.in("product_id", brandProductIds);
+    }
 
-  // Cache warehouse names
-  const warehouseCache: Record<string, Warehouse | null> = {};
+    const [{ data }, { count }] = await Promise.all([
+      supabase
+        .rpc("list_warehouse_transactions", {
+          p_warehouse_id: warehouseId,
+          p_limit: pageSize,
+          p_offset: before ? 0 : offset,
+          p_product_ids: brandProductIds,
+          p_before: before,
+          p_before_id: beforeId,
+        })
+        .select(TRANSACTION_SELECT),
+      countQuery,
+    ]);
+    transactions = data;
+    total = count;
+  } else {
+    // Build warehouse filter based on transaction type direction:
+    // - TRANSFER_OUT / SALE: warehouse is the source (from_warehouse_id)
+    // - TRANSFER_IN / RESTOCK: warehouse is the destination (to_warehouse_id)
+    // - ADJUSTMENT: warehouse is the source (from_warehouse_id)
+    // Note: Generic removed to avoid "Type instantiation is excessively deep" with Supabase query builder
+    const transactionsBase = supabase
+      .from("transactions")
+      // Total comes back in Content-Range with the page. "estimated" is exact
+      // below the PostgREST max-rows threshold and falls back to the planner
+      // estimate for deep histories instead of a full COUNT scan.
+      .select(TRANSACTION_SELECT, { count: "estimated" });
+    let query =
+      transactionType === "TRANSFER_OUT" || transactionType === "SALE" || transactionType === "ADJUSTMENT"
+        ? transactionsBase.eq("from_warehouse_id", warehouseId)
+        : transactionsBase.eq("to_warehouse_id", warehouseId);
 
-  async function getWarehouse(wid: string | undefined): Promise<Warehouse | null> {
-    if (!wid) return null;
-    if (wid in warehouseCache) return warehouseCache[wid];
+    query = query.eq("transaction_type", transactionType);
 
-    const { data } = await supabase
-      .from("warehouses")
-      .select("*")
-      .eq("id", wid)
-      .single();
+    // Apply brand filter
+    if (brandProductIds !== null) {
+      query = query.in("product_id", brandProductIds);
+    }
 
-    if (data) {
-      warehouseCache[wid] = {
-        id: data.id,
-        name: data.name,
-        manager_id: data.manager_id || undefined,
-      };
+    // Exclude invoice-linked sales when requested (for On-the-Spot tab)
+    if (transactionType === "SALE" && excludeInvoiced) {
+      query = query.is("invoice_id", null);
+    }
+
+    // Exclude soft-deleted transactions
+    query = query.is("deleted_at", null);
+
+    // Apply ordering (id breaks ties, e.g. TRANSFER_OUT/IN pairs share created_at)
+    query = query
+      .order("created_at", { ascending: false })
+      .order("id", { ascending: false });
+
+    // Apply pagination. With a cursor, seek past the last row seen instead of
+    // making Postgres scan and discard every row before the offset.
+    if (before) {
+      query = beforeId
+        ? query.or(`created_at.lt."${before}",and(created_at.eq."${before}",id.lt.${beforeId})`)
+        : query.lt("created_at", before);
+      query = query.limit(pageSize);
     } else {
-      warehouseCache[wid] = null;
+      query = query.range(offset, offset + pageSize - 1);
     }
-    return warehouseCache[wid];
-  }
 
-  const items = [];
-  for (const t of (transactions as Transaction[]) || []) {
-    const product = t.products;
-    const fromWarehouse = await getWarehouse(t.from_warehouse_id);
-    const toWarehouse = await getWarehouse(t.to_warehouse_id);
-
-    items.push({
-      id: t.id,
-      transaction_type: t.transaction_type,
-      product_id: t.product_id,
-      from_warehouse_id: t.from_warehouse_id || null,
-      to_warehouse_id: t.to_warehouse_id || null,
-      quantity: t.quantity,
-      unit_price: t.unit_price || null,
-      reference_note: t.reference_note || null,
-      created_by: t.created_by || null,
-      created_at: t.created_at,
-      product: product
-        ? {
-            id: product.id,
-            sku: product.sku,
-            name: product.name,
-            brand: product.brand,
-            category: product.category || null,
-            retail_price: product.retail_price || null,
-          }
-        : null,
-      from_warehouse: fromWarehouse
-        ? {
-            id: fromWarehouse.id,
-            name: fromWarehouse.name,
-            manager_id: fromWarehouse.manager_id || null,
-          }
-        : null,
-      to_warehouse: toWarehouse
-        ? {
-            id: toWarehouse.id,
-            name: toWarehouse.name,
-            manager_id: toWarehouse.manager_id || null,
-          }
-        : null,
-    });
+    const result = await query;
+    transactions = result.data;
+    total = result.count;
   }
 
+  const items = ((transactions as Transaction[]) || []).map(toTransactionResponse);
+  const last = items.length === pageSize ? items[items.length - 1] : null;
+
   return NextResponse.json({
     items,
     total: total || 0,
     page,
     page_size: pageSize,
+    next_before: last ? last.created_at : null,
+    next_before_id: last ? last.id : null,
   });
 }
@@ -4,6 +4,8 @@ import {
   createServiceClient,
   requireAdmin,
 } from "@/lib/supabase-server";
+import { logError } from "@/lib/logger";
+import { isUuid } from "@/lib/utils";
 
 interface BulkTransferItem {
   product_id: string;
@@ -51,6 +53,13 @@ export async function POST(request: NextRequest) {
     );
   }
 
+  if (!isUuid(from_warehouse_id) || !isUuid(to_warehouse_id)) {
+    return NextResponse.json(
+      { detail: "from_warehouse_id and to_warehouse_id must be UUIDs" },
+      { status: 400 }
+    );
+  }
+
   if (from_warehouse_id === to_warehouse_id) {
     return NextResponse.json(
       { detail: "Source and destination warehouse cannot be the same" },
@@ -63,7 +72,7 @@ export async function POST(request: NextRequest) {
     (item) =>
       item &&
       typeof item.product_id === "string" &&
-      item.product_id &&
+      isUuid(item.product_id) &&
       typeof item.quantity === "number" &&
       item.quantity > 0
   );
@@ -86,35 +95,29 @@ export async function POST(request: NextRequest) {
 
   const supabase = createServiceClient();
 
-  // Validate warehouses exist
-  const { data: source, error: sourceError } = await supabase
+  // Validate both warehouses exist with one query
+  const { data: warehouses } = await supabase
     .from("warehouses")
-    .select("id, name")
-    .eq("id", from_warehouse_id)
-    .single();
+    .select("id")
+    .in("id", [from_warehouse_id, to_warehouse_id]);
 
-  if (sourceError || !source) {
+  const source = warehouses?.find((w) => w.id === from_warehouse_id);
+  const dest = warehouses?.find((w) => w.id === to_warehouse_id);
+
+  if (!source) {
     return NextResponse.json(
       { detail: "Source warehouse not found" },
       { status: 404 }
     );
   }
 
-  const { data: dest, error: destError } = await supabase
-    .from("warehouses")
-    .select("id, name")
-    .eq("id", to_warehouse_id)
-    .single();
-
-  if (destError || !dest) {
+  if (!dest) {
     return NextResponse.json(
       { detail: "Destination warehouse not found" },
       { status: 404 }
     );
   }
 
-  const note = reference_note || `Bulk transfer to ${dest.name}`;
-
   try {
     const { data: result, error: rpcError } = await supabase.rpc(
       "record_bulk_transfer",
@@ -122,7 +125,7 @@ export async function POST(request: NextRequest) {
         p_from_warehouse_id: from_warehouse_id,
         p_to_warehouse_id: to_warehouse_id,
         p_items: validItems,
-        p_note: note,
+        p_note: reference_note || null,
         p_user_id: user.userId,
       }
     );
@@ -154,7 +157,12 @@ export async function POST(request: NextRequest) {
 
     return NextResponse.json(response);
   } catch (err) {
-    console.error("Bulk transfer error:", err);
+    logError("Bulk transfer failed", err, {
+      route: "POST /api/transfers/bulk",
+      from_warehouse_id,
+      to_warehouse_id,
+      item_count: validItems.length,
+    });
     return NextResponse.json(
       { detail: `Bulk transfer failed: ${err}` },
       { status: 500 }
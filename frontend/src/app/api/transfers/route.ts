@@ -4,6 +4,8 @@ import {
   createServiceClient,
   requireAdmin,
 } from "@/lib/supabase-server";
+import { logError } from "@/lib/logger";
+import { isUuid } from "@/lib/utils";
 
 interface TransferRequest {
   from_warehouse_id: string;
@@ -39,86 +41,40 @@ export async function POST(request: NextRequest) {
     );
   }
 
-  if (quantity <= 0) {
+  if (![from_warehouse_id, to_warehouse_id, product_id].every(isUuid)) {
     return NextResponse.json(
-      { detail: "Quantity must be greater than 0" },
+      { detail: "from_warehouse_id, to_warehouse_id, and product_id must be UUIDs" },
       { status: 400 }
     );
   }
 
-  const supabase = createServiceClient();
-
-  // Validate warehouses exist
-  const { data: source, error: sourceError } = await supabase
-    .from("warehouses")
-    .select("id, name")
-    .eq("id", from_warehouse_id)
-    .single();
-
-  if (sourceError || !source) {
-    return NextResponse.json(
-      { detail: "Source warehouse not found" },
-      { status: 404 }
-    );
-  }
-
-  const { data: dest, error: destError } = await supabase
-    .from("warehouses")
-    .select("id, name")
-    .eq("id", to_warehouse_id)
-    .single();
-
-  if (destError || !dest) {
-    return NextResponse.json(
-      { detail: "Destination warehouse not found" },
-      { status: 404 }
-    );
-  }
-
-  // Validate product exists
-  const { data: product, error: productError } = await supabase
-    .from("products")
-    .select("id, name")
-    .eq("id", product_id)
-    .single();
-
-  if (productError || !product) {
-    return NextResponse.json({ detail: "Product not found" }, { status: 404 });
-  }
-
-  // Pre-validate stock (RPC will re-validate atomically)
-  const { data: sourceInventory } = await supabase
-    .from("inventory_items")
-    .select("quantity_on_hand")
-    .eq("warehouse_id", from_warehouse_id)
-    .eq("product_id", product_id)
-    .single();
-
-  const currentStock = sourceInventory?.quantity_on_hand ?? 0;
-  if (currentStock < quantity) {
+  if (quantity <= 0) {
     return NextResponse.json(
-      {
-        detail: `Insufficient stock. Available: ${currentStock}, Requested: ${quantity}`,
-      },
+      { detail: "Quantity must be greater than 0" },
       { status: 400 }
     );
   }
 
-  const note = reference_note || `Transfer to ${dest.name}`;
+  const supabase = createServiceClient();
 
+  // record_transfer validates the warehouses and product, checks stock
+  // under a row lock and defaults the note, all in one call
   try {
     const { data: result, error: rpcError } = await supabase.rpc("record_transfer", {
       p_from_warehouse_id: from_warehouse_id,
       p_to_warehouse_id: to_warehouse_id,
       p_product_id: product_id,
       p_quantity: quantity,
-      p_note: note,
+      p_note: reference_note || null,
       p_user_id: user.userId,
     });
 
     if (rpcError || !result || result.length === 0) {
       const errMsg = rpcError?.message ?? "Transfer failed";
-      return NextResponse.json({ detail: errMsg }, { status: 400 });
+      return NextResponse.json(
+        { detail: errMsg },
+        { status: rpcError?.code === "P0002" ? 404 : 400 }
+      );
     }
 
     const row = Array.isArray(result) ? result[0] : result;
@@ -133,7 +89,12 @@ export async function POST(request: NextRequest) {
       quantity,
     });
   } catch (err) {
-    console.error("Transfer error:", err);
+    logError("Transfer failed", err, {
+      route: "POST /api/transfers",
+      from_warehouse_id,
+      to_warehouse_id,
+      product_id,
+    });
     return NextResponse.json(
       { detail: `Transfer failed: ${err}` },
       { status: 500 }
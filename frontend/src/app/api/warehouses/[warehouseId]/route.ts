@@ -4,6 +4,7 @@ import {
   createServiceClient,
   requireWarehouseAccess,
 } from "@/lib/supabase-server";
+import { getCachedWarehouse } from "@/lib/cache";
 
 export async function GET(
   request: NextRequest,
@@ -21,15 +22,9 @@ export async function GET(
   const accessError = requireWarehouseAccess(user, warehouseId);
   if (accessError) return accessError;
 
-  const supabase = createServiceClient();
+  const data = await getCachedWarehouse(createServiceClient(), warehouseId);
 
-  const { data, error: dbError } = await supabase
-    .from("warehouses")
-    .select("*")
-    .eq("id", warehouseId)
-    .single();
-
-  if (dbError || !data) {
+  if (!data) {
     return NextResponse.json({ detail: "Warehouse not found" }, { status: 404 });
   }
 
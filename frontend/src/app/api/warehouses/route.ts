@@ -1,5 +1,6 @@
 import { NextResponse } from "next/server";
 import { getUserFromRequest, createServiceClient } from "@/lib/supabase-server";
+import { getCachedWarehouse, getCachedWarehouseList } from "@/lib/cache";
 
 export async function GET() {
   const { user, error } = await getUserFromRequest();
@@ -10,28 +11,15 @@ export async function GET() {
 
   const supabase = createServiceClient();
 
-  let query = supabase.from("warehouses").select("*");
-
   if (user.role === "admin" || user.role === "viewer") {
     // Admins and viewers see all warehouses
-    query = query.order("name");
-  } else {
-    // Partners see only their warehouse
-    if (!user.warehouseId) {
-      return NextResponse.json([]);
-    }
-    query = query.eq("id", user.warehouseId);
+    return NextResponse.json(await getCachedWarehouseList(supabase));
   }
 
-  const { data } = await query;
-
-  const warehouses = (data || []).map((w) => ({
-    id: w.id,
-    name: w.name,
-    manager_id: w.manager_id || null,
-    is_main: w.is_main ?? false,
-    created_at: w.created_at || null,
-  }));
-
-  return NextResponse.json(warehouses);
+  // Partners see only their warehouse
+  if (!user.warehouseId) {
+    return NextResponse.json([]);
+  }
+  const warehouse = await getCachedWarehouse(supabase, user.warehouseId);
+  return NextResponse.json(warehouse ? [warehouse] : []);
 }
@@ -309,6 +309,8 @@ export const api = {
       brand?: string;
       page?: number;
       page_size?: number;
+      before?: string;
+      before_id?: string;
     }
   ) {
     const params = new URLSearchParams();
@@ -319,6 +321,8 @@ export const api = {
     if (options?.page) params.set("page", options.page.toString());
     if (options?.page_size)
       params.set("page_size", options.page_size.toString());
+    if (options?.before) params.set("before", options.before);
+    if (options?.before_id) params.set("before_id", options.before_id);
 
     const query = params.toString() ? `?${params.toString()}` : "";
     const res = await fetchApi(`/api/transactions/${warehouseId}${query}`);
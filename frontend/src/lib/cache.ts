@@ -0,0 +1,140 @@
+/**
+ * In-process TTL caches for rarely-changing lookups used by API routes.
+ * Entries live in module scope, so they are shared by every request served
+ * from the same Node.js process and expire on their own after the TTL.
+ */
+
+import type { SupabaseClient } from "@supabase/supabase-js";
+
+interface CacheEntry<V> {
+  value: V;
+  expiresAt: number;
+}
+
+/**
+ * Minimal TTL cache with a size cap. When full, the oldest entry is evicted
+ * (Map iteration order is insertion order).
+ */
+export class TTLCache<V> {
+  private entries = new Map<string, CacheEntry<V>>();
+
+  constructor(
+    private readonly ttlMs: number,
+    private readonly maxSize = 1024
+  ) {}
+
+  get(key: string): V | undefined {
+    const entry = this.entries.get(key);
+    if (!entry) return undefined;
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(key);
+      return undefined;
+    }
+    return entry.value;
+  }
+
+  /** Store a value; ttlMs overrides the cache's default for this entry. */
+  set(key: string, value: V, ttlMs = this.ttlMs): void {
+    this.entries.delete(key);
+    if (this.entries.size >= this.maxSize) {
+      const oldest = this.entries.keys().next().value;
+      if (oldest !== undefined) this.entries.delete(oldest);
+    }
+    this.entries.set(key, { value, expiresAt: Date.now() + ttlMs });
+  }
+
+  delete(key: string): void {
+    this.entries.delete(key);
+  }
+
+  clear(): void {
+    this.entries.clear();
+  }
+}
+
+export interface CachedWarehouse {
+  id: string;
+  name: string;
+  manager_id: string | null;
+  is_main: boolean;
+  created_at: string | null;
+}
+
+const warehouseCache = new TTLCache<CachedWarehouse>(60_000);
+const warehouseListCache = new TTLCache<CachedWarehouse[]>(30_000, 1);
+const brandsCache = new TTLCache<string[]>(30_000, 1);
+
+/**
+ * Get a warehouse by ID, served from memory for 60s after the first read.
+ * Returns null if the warehouse does not exist (misses are not cached, so
+ * a newly created warehouse is visible immediately).
+ */
+export async function getCachedWarehouse(
+  supabase: SupabaseClient,
+  warehouseId: string
+): Promise<CachedWarehouse | null> {
+  const cached = warehouseCache.get(warehouseId);
+  if (cached) return cached;
+
+  const { data } = await supabase
+    .from("warehouses")
+    .select("id, name, manager_id, is_main, created_at")
+    .eq("id", warehouseId)
+    .maybeSingle();
+
+  if (!data) return null;
+
+  const warehouse: CachedWarehouse = {
+    id: data.id,
+    name: data.name,
+    manager_id: data.manager_id || null,
+    is_main: data.is_main ?? false,
+    created_at: data.created_at || null,
+  };
+  warehouseCache.set(warehouseId, warehouse);
+  return warehouse;
+}
+
+/**
+ * Get every warehouse ordered by name, served from memory for 30s.
+ * Partners only ever see their own warehouse; use getCachedWarehouse for that.
+ */
+export async function getCachedWarehouseList(
+  supabase: SupabaseClient
+): Promise<CachedWarehouse[]> {
+  const cached = warehouseListCache.get("all");
+  if (cached) return cached;
+
+  const { data, error } = await supabase
+    .from("warehouses")
+    .select("id, name, manager_id, is_main, created_at")
+    .order("name");
+
+  const warehouses: CachedWarehouse[] = (data || []).map((w) => ({
+    id: w.id,
+    name: w.name,
+    manager_id: w.manager_id || null,
+    is_main: w.is_main ?? false,
+    created_at: w.created_at || null,
+  }));
+
+  if (!error) warehouseListCache.set("all", warehouses);
+  return warehouses;
+}
+
+/**
+ * Get the distinct, sorted brand list, served from memory for 30s.
+ */
+export async function getCachedBrands(
+  supabase: SupabaseClient
+): Promise<string[]> {
+  const cached = brandsCache.get("all");
+  if (cached) return cached;
+
+  const { data, error } = await supabase.rpc("list_brands");
+  const brands = ((data as { brand: string }[]) || []).map((row) => row.brand);
+
+  // Don't pin a failed lookup for the whole TTL
+  if (!error) brandsCache.set("all", brands);
+  return brands;
+}
@@ -0,0 +1,46 @@
+/**
+ * Structured logging for API routes.
+ * Each entry is written as a single JSON line so log drains can parse and
+ * filter it, instead of multi-line console output interleaving under load.
+ */
+
+type LogContext = Record<string, unknown>;
+
+// Debug entries are dropped in production unless DEBUG=true is set
+const DEBUG_ENABLED =
+  process.env.NODE_ENV !== "production" || process.env.DEBUG === "true";
+
+function serializeError(err: unknown) {
+  if (err instanceof Error) {
+    return { name: err.name, message: err.message, stack: err.stack };
+  }
+  return { message: String(err) };
+}
+
+function write(level: "error" | "debug", message: string, err: unknown, context: LogContext) {
+  console.error(
+    JSON.stringify({
+      level,
+      time: new Date().toISOString(),
+      message,
+      ...context,
+      error: serializeError(err),
+    })
+  );
+}
+
+/**
+ * Log an error with optional request context (ids, route, etc.).
+ */
+export function logError(message: string, err: unknown, context: LogContext = {}) {
+  write("error", message, err, context);
+}
+
+/**
+ * Log an expected failure (e.g. a rejected token) that is only useful when
+ * debugging. No-op in production unless DEBUG=true.
+ */
+export function logDebug(message: string, err: unknown, context: LogContext = {}) {
+  if (!DEBUG_ENABLED) return;
+  write("debug", message, err, context);
+}
@@ -3,10 +3,13 @@
  * Uses service role key to bypass RLS for admin operations.
  */
 
-import { createClient } from "@supabase/supabase-js";
+import { createHash } from "node:crypto";
+import { createClient, type SupabaseClient } from "@supabase/supabase-js";
 import { createServerClient } from "@supabase/ssr";
 import { cookies } from "next/headers";
 import { NextResponse } from "next/server";
+import { TTLCache } from "@/lib/cache";
+import { logDebug, logError } from "@/lib/logger";
 
 // Types
 export interface UserContext {
@@ -21,24 +24,41 @@ export interface AuthResult {
   error: NextResponse | null;
 }
 
+// Read once at module load. Missing values are reported when a client is
+// first created rather than here, so builds without env vars still succeed.
+const SUPABASE_URL = process.env.NEXT_PUBLIC_SUPABASE_URL;
+const SUPABASE_ANON_KEY = process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY;
+const SUPABASE_SERVICE_KEY = process.env.SUPABASE_SERVICE_KEY;
+
+// Resolved user contexts keyed by a hash of the access token (raw tokens are
+// never stored). A context outlives a role or warehouse change by at most the
+// TTL, and never outlives the token's own expiry.
+const USER_CONTEXT_TTL_MS = 60_000;
+const userContextCache = new TTLCache<UserContext>(USER_CONTEXT_TTL_MS, 10_000);
+
+let sharedServiceClient: SupabaseClient | null = null;
+
 /**
- * Create a Supabase client with service role key (bypasses RLS).
+ * Get the Supabase client with service role key (bypasses RLS).
  * Use this for admin operations in API routes.
+ *
+ * The client holds no per-user state, so one instance is created lazily and
+ * shared by every request in the process, reusing its keep-alive connections.
  */
 export function createServiceClient() {
-  const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!;
-  const serviceKey = process.env.SUPABASE_SERVICE_KEY!;
+  if (sharedServiceClient) return sharedServiceClient;
 
-  if (!supabaseUrl || !serviceKey) {
+  if (!SUPABASE_URL || !SUPABASE_SERVICE_KEY) {
     throw new Error("Missing SUPABASE_URL or SUPABASE_SERVICE_KEY");
   }
 
-  return createClient(supabaseUrl, serviceKey, {
+  sharedServiceClient = createClient(SUPABASE_URL, SUPABASE_SERVICE_KEY, {
     auth: {
       autoRefreshToken: false,
       persistSession: false,
     },
   });
+  return sharedServiceClient;
 }
 
 /**
@@ -49,8 +69,8 @@ export async function createServerSupabaseClient() {
   const cookieStore = await cookies();
 
   return createServerClient(
-    process.env.NEXT_PUBLIC_SUPABASE_URL!,
-    process.env.NEXT_PUBLIC_SUPABASE_ANON_KEY!,
+    SUPABASE_URL!,
+    SUPABASE_ANON_KEY!,
     {
       cookies: {
         getAll() {
@@ -69,17 +89,44 @@ export async function createServerSupabaseClient() {
 /**
  * Get the current authenticated user from the request.
  * Returns user context with role and warehouse info.
+ *
+ * The access token is verified locally with getClaims() (signature checked
+ * against the project's cached signing keys) instead of a getUser() round
+ * trip to Supabase Auth. The resolved context is cached per token for 60s
+ * (or until the token expires, if sooner), so repeat requests on the same
+ * session also skip the profile lookup. Failed profile lookups are not cached.
  */
 export async function getUserFromRequest(): Promise<AuthResult> {
   try {
-    // Get user from session cookie
     const supabase = await createServerSupabaseClient();
+
+    // The session is read from the cookie without a network call. Its token
+    // is only trusted once getClaims() has verified it, or if it matches a
+    // context cached after verification.
     const {
-      data: { user },
-      error: authError,
-    } = await supabase.auth.getUser();
+      data: { session },
+    } = await supabase.auth.getSession();
+    const accessToken = session?.access_token;
+    const cacheKey = accessToken
+      ? createHash("sha256").update(accessToken).digest("hex")
+      : null;
+
+    const cached = cacheKey ? userContextCache.get(cacheKey) : undefined;
+    if (cached) {
+      return { user: cached, error: null };
+    }
+
+    const { data: claimsData, error: authError } = accessToken
+      ? await supabase.auth.getClaims(accessToken)
+      : { data: null, error: null };
+    const claims = claimsData?.claims;
+    const user = claims?.sub
+      ? { id: claims.sub, email: (claims.email as string | undefined) ?? null }
+      : null;
 
     if (authError || !user) {
+      // Expected for expired or garbage tokens; only worth seeing when debugging
+      if (authError) logDebug("Token rejected", authError);
       return {
         user: null,
         error: NextResponse.json(
@@ -92,51 +139,59 @@ export async function getUserFromRequest(): Promise<AuthResult> {
     // Use service client to fetch profile (bypasses RLS)
     const serviceClient = createServiceClient();
 
-    // Get profile with role
-    const { data: profiles } = await serviceClient
+    // Get profile with role and any managed warehouse in one query
+    const { data: profile, error: profileError } = await serviceClient
       .from("profiles")
-      .select("*")
-      .eq("id", user.id);
-
-    let profile = profiles?.[0];
+      .select("role, warehouses!manager_id(id)")
+      .eq("id", user.id)
+      .maybeSingle();
+
+    // A failed lookup must not be mistaken for a missing profile (which would
+    // downgrade the user to partner and cache that)
+    if (profileError) {
+      logError("Profile lookup failed", profileError, { userId: user.id });
+      return {
+        user: null,
+        error: NextResponse.json(
+          { detail: "Failed to load user profile" },
+          { status: 500 }
+        ),
+      };
+    }
 
     // Auto-create profile if it doesn't exist
-    if (!profile) {
-      const newProfile = {
+    if (profile === null) {
+      await serviceClient.from("profiles").insert({
         id: user.id,
         role: "partner",
         full_name: user.email,
-      };
-      await serviceClient.from("profiles").insert(newProfile);
-      profile = newProfile;
+      });
     }
 
-    const role = (profile.role as "admin" | "partner" | "viewer") || "partner";
+    const role = (profile?.role as "admin" | "partner" | "viewer") || "partner";
 
-    // Get warehouse if user is a partner
+    // Warehouse only applies to partners
     let warehouseId: string | null = null;
-    if (role === "partner") {
-      const { data: warehouses } = await serviceClient
-        .from("warehouses")
-        .select("id")
-        .eq("manager_id", user.id);
-
-      if (warehouses?.[0]) {
-        warehouseId = warehouses[0].id;
-      }
+    if (role === "partner" && profile?.warehouses?.[0]) {
+      warehouseId = profile.warehouses[0].id;
     }
 
-    return {
-      user: {
-        userId: user.id,
-        email: user.email || null,
-        role,
-        warehouseId,
-      },
-      error: null,
+    const context: UserContext = {
+      userId: user.id,
+      email: user.email || null,
+      role,
+      warehouseId,
     };
+    // Cap the entry at the token's exp claim (seconds since epoch)
+    const ttlMs =
+      typeof claims?.exp === "number"
+        ? Math.min(USER_CONTEXT_TTL_MS, claims.exp * 1000 - Date.now())
+        : USER_CONTEXT_TTL_MS;
+    if (cacheKey && ttlMs > 0) userContextCache.set(cacheKey, context, ttlMs);
+
+    return { user: context, error: null };
   } catch (err) {
-    console.error("Auth error:", err);
+    logError("Auth error", err);
     return {
       user: null,
       error: NextResponse.json(
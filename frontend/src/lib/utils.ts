@@ -13,3 +13,18 @@ export function formatCurrency(amount: number | string | undefined | null) {
 
   return `PKR ${num.toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 2 })}`;
 }
+
+const UUID_RE = /^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$/i;
+
+export function isUuid(value: string) {
+  return UUID_RE.test(value);
+}
+
+// ISO-8601 timestamp as returned for timestamptz columns, e.g.
+// 2026-01-31T10:15:00.123456+00:00 (space separator and Z also accepted)
+const ISO_TIMESTAMP_RE =
+  /^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d{1,6})?(Z|[+-]\d{2}(:?\d{2})?)?$/;
+
+export function isIsoTimestamp(value: string) {
+  return ISO_TIMESTAMP_RE.test(value) && !isNaN(Date.parse(value));
+}
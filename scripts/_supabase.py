@@ -0,0 +1,29 @@
+"""
+Shared Supabase client for the scripts in this directory.
+Usage: from _supabase import get_client; supabase = get_client()
+
+The client is created once per process, so scripts that import each
+other (or call get_client() repeatedly) reuse one connection pool.
+"""
+
+import os
+import sys
+from functools import lru_cache
+
+from dotenv import load_dotenv
+from supabase import create_client, Client
+
+# Load environment variables from .env file in scripts directory or project root
+load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
+load_dotenv()  # Also try project root
+
+
+@lru_cache(maxsize=1)
+def get_client() -> Client:
+    """Return the process-wide Supabase client (service key), exiting if it isn't configured."""
+    url = os.getenv("SUPABASE_URL")
+    key = os.getenv("SUPABASE_SERVICE_KEY")
+    if not url or not key:
+        print("ERROR: Missing SUPABASE_URL or SUPABASE_SERVICE_KEY in environment")
+        sys.exit(1)
+    return create_client(url, key)
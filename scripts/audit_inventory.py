@@ -17,8 +17,13 @@ This script will:
 import csv
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from collections import defaultdict
+from collections.abc import Iterator
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
 
 from dotenv import load_dotenv
 from supabase import create_client, Client
@@ -33,38 +38,83 @@ SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 # Main Warehouse UUID
 MAIN_WAREHOUSE_ID = "00000000-0000-0000-0000-000000000001"
 
+# tx_summary field for each (direction, transaction type) the audit counts
+TX_SUMMARY_KEYS = {
+    ("in", "RESTOCK"): "restock",
+    ("in", "ADJUSTMENT"): "adjustment",
+    ("in", "TRANSFER_IN"): "transfer_in",
+    ("out", "SALE"): "sale",
+    ("out", "TRANSFER_OUT"): "transfer_out",
+}
 
+# Totals for a product with no counted transactions (read-only; copied for new entries)
+EMPTY_TX_SUMMARY = dict.fromkeys(TX_SUMMARY_KEYS.values(), 0)
+
+# Rows shown in the Section 2 comparison table (flagged and largest differences first)
+COMPARISON_ROW_LIMIT = 200
+
+# Product ids per detail-transaction request (keeps the in_ filter URL short)
+DETAIL_BATCH_SIZE = 100
+
+
+@lru_cache(maxsize=4096)
 def normalize_sku(sku: str) -> str:
     """Normalize SKU for matching."""
     return sku.strip().upper().replace(" ", "-").replace("_", "-")
 
 
-def create_sku_variations(sku: str) -> list[str]:
+@lru_cache(maxsize=4096)
+def create_sku_variations(sku: str) -> tuple[str, ...]:
     """Create multiple SKU variations to try matching."""
-    normalized = normalize_sku(sku)
-    return [
-        sku.strip(),
-        sku.strip().upper(),
+    stripped = sku.strip()
+    normalized = normalize_sku(stripped)
+    return (
+        stripped,
+        stripped.upper(),
         normalized,
         normalized.replace("-", "_"),
         normalized.replace("-", ""),
-    ]
+    )
 
 
-def parse_gemini_csv(csv_path: str) -> list[dict]:
-    """Parse the Gemini Export CSV (standard format with headers)."""
-    items = []
+def iter_sku_keys(products: list[dict]):
+    """Yield (lookup key, product) pairs for every SKU variant of each product."""
+    for p in products:
+        normalized = normalize_sku(p["sku"])
+        yield p["sku"], p
+        yield p["sku"].upper(), p
+        yield normalized, p
+        yield normalized.replace("-", "_"), p
+        yield normalized.replace("-", ""), p
 
+
+def parse_gemini_csv(csv_path: str) -> Iterator[dict]:
+    """
+    Parse the Gemini Export CSV (standard format with headers).
+    Items are yielded as rows are read, so the file is never held in memory.
+    """
     if not os.path.exists(csv_path):
         print(f"WARNING: Gemini CSV not found at {csv_path}")
-        return items
+        return
+
+    with open(csv_path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        try:
+            idx_sku = header.index("Product Code")
+            idx_qty = header.index("Qty")
+            idx_desc = header.index("Item Description")
+        except ValueError:
+            print(f"WARNING: {csv_path} is missing Product Code, Qty or Item Description columns")
+            return
+        min_len = max(idx_sku, idx_qty, idx_desc) + 1
 
-    with open(csv_path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
         for row_num, row in enumerate(reader, start=2):
-            sku = row.get("Product Code", "").strip()
-            qty_str = row.get("Qty", "0").strip()
-            description = row.get("Item Description", "").strip()
+            if len(row) < min_len:
+                continue
+            sku = row[idx_sku].strip()
+            qty_str = row[idx_qty].strip()
+            description = row[idx_desc].strip()
 
             if not sku or not qty_str:
                 continue
@@ -75,15 +125,13 @@ def parse_gemini_csv(csv_path: str) -> list[dict]:
                 continue
 
             if qty > 0:
-                items.append({
+                yield {
                     "source": "Gemini Export (Feb 4)",
                     "row": row_num,
                     "sku": sku,
                     "name": description,
                     "quantity": qty,
-                })
-
-    return items
+                }
 
 
 def parse_december_csv(csv_path: str) -> list[dict]:
@@ -94,45 +142,67 @@ def parse_december_csv(csv_path: str) -> list[dict]:
         print(f"WARNING: December CSV not found at {csv_path}")
         return items
 
-    with open(csv_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    # Data starts at row 13 (index 12), columns are at index 3,4,5
-    for i, line in enumerate(lines[12:], start=13):
-        parts = line.strip().split(",")
-        if len(parts) >= 6:
-            sku = parts[3].strip()
-            name = parts[4].strip()
-            qty_str = parts[5].strip()
-
-            if not qty_str:
-                continue
-
-            try:
-                qty = int(qty_str)
-            except ValueError:
-                continue
-
-            if qty > 0:
-                items.append({
-                    "source": "December Reconciliation",
-                    "row": i,
-                    "sku": sku,
-                    "name": name,
-                    "quantity": qty,
-                })
+    with open(csv_path, "r", newline="", encoding="utf-8") as f:
+        # Skip the 12 header lines, then let csv.reader tokenize the rest
+        reader = csv.reader(islice(f, 12, None))
+
+        # Data starts at row 13, columns are at index 3,4,5
+        for i, parts in enumerate(reader, start=13):
+            if len(parts) >= 6:
+                sku = parts[3].strip()
+                name = parts[4].strip()
+                qty_str = parts[5].strip()
+
+                if not qty_str:
+                    continue
+
+                try:
+                    qty = int(qty_str)
+                except ValueError:
+                    continue
+
+                if qty > 0:
+                    items.append({
+                        "source": "December Reconciliation",
+                        "row": i,
+                        "sku": sku,
+                        "name": name,
+                        "quantity": qty,
+                    })
 
     return items
 
 
 def match_sku_to_product(sku: str, products_by_sku: dict) -> dict | None:
-    """Try to match a SKU to a product using variations."""
-    for variation in create_sku_variations(sku):
+    """
+    Try to match a SKU to a product using variations.
+    The plain and uppercased SKU are tried first (the common case); the
+    normalized variations are only built when neither matches.
+    """
+    stripped = sku.strip()
+    product = products_by_sku.get(stripped) or products_by_sku.get(stripped.upper())
+    if product:
+        return product
+
+    for variation in create_sku_variations(sku)[2:]:
         if variation in products_by_sku:
             return products_by_sku[variation]
     return None
 
 
+def chunked(rows: list, size: int):
+    """Yield successive slices of rows with at most size elements."""
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def write_lines(lines: list[str]):
+    """Write buffered report lines to stdout in one call and clear the buffer."""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+        lines.clear()
+
+
 def main():
     # Parse command line arguments for CSV files
     csv_files = []
@@ -159,157 +229,144 @@ def main():
     print("Connecting to Supabase...")
     supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
 
+    # The three reads are independent, so their requests run concurrently
+    print("Loading products, inventory and transaction history...")
+    products_query = supabase.table("products").select("id, sku, name")
+    inventory_query = supabase.table("inventory_items")\
+        .select("product_id, quantity_on_hand")\
+        .eq("warehouse_id", MAIN_WAREHOUSE_ID)
+    # Transaction totals per product, type and direction, summed in the
+    # database (audit_tx_summary, migration 029)
+    summary_query = supabase.rpc("audit_tx_summary", {"p_warehouse_id": MAIN_WAREHOUSE_ID})
+
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        futures = [
+            executor.submit(query.execute)
+            for query in (products_query, inventory_query, summary_query)
+        ]
+        products_response, inventory_response, summary_response = (
+            future.result() for future in futures
+        )
+
     # =========================================================================
-    # STEP 1: Load all products
+    # STEP 1: Index products
     # =========================================================================
-    print("Loading products from database...")
-    products_response = supabase.table("products").select("id, sku, name").execute()
-
     products_by_id = {p["id"]: p for p in products_response.data}
-    products_by_sku = {}
-    for p in products_response.data:
-        products_by_sku[p["sku"]] = p
-        products_by_sku[p["sku"].upper()] = p
-        products_by_sku[normalize_sku(p["sku"])] = p
-        products_by_sku[normalize_sku(p["sku"]).replace("-", "_")] = p
-        products_by_sku[normalize_sku(p["sku"]).replace("-", "")] = p
+    products_by_sku = dict(iter_sku_keys(products_response.data))
 
     print(f"  Found {len(products_response.data)} products")
 
     # =========================================================================
-    # STEP 2: Load current inventory
+    # STEP 2: Index current inventory
     # =========================================================================
-    print("Loading current inventory...")
-    inventory_response = supabase.table("inventory_items")\
-        .select("product_id, quantity_on_hand")\
-        .eq("warehouse_id", MAIN_WAREHOUSE_ID)\
-        .execute()
-
     current_inventory = {item["product_id"]: item["quantity_on_hand"]
                          for item in inventory_response.data}
     print(f"  Found {len(inventory_response.data)} inventory items in Main Warehouse")
 
     # =========================================================================
-    # STEP 3: Load all transactions for Main Warehouse
+    # STEP 3: Summarize transactions for Main Warehouse
     # =========================================================================
-    print("Loading transaction history...")
-
-    # Get inbound transactions (RESTOCK, ADJUSTMENT, TRANSFER_IN)
-    inbound_response = supabase.table("transactions")\
-        .select("product_id, transaction_type, quantity, reference_note, created_at")\
-        .eq("to_warehouse_id", MAIN_WAREHOUSE_ID)\
-        .execute()
-
-    # Get outbound transactions (SALE, TRANSFER_OUT)
-    outbound_response = supabase.table("transactions")\
-        .select("product_id, transaction_type, quantity, reference_note, created_at")\
-        .eq("from_warehouse_id", MAIN_WAREHOUSE_ID)\
-        .execute()
-
-    print(f"  Found {len(inbound_response.data)} inbound transactions")
-    print(f"  Found {len(outbound_response.data)} outbound transactions")
-
-    # Aggregate transactions per product
-    tx_summary = defaultdict(lambda: {
-        "restock": 0, "adjustment": 0, "transfer_in": 0,
-        "sale": 0, "transfer_out": 0,
-        "restock_txns": [], "adjustment_txns": [],
-    })
-
-    for tx in inbound_response.data:
-        pid = tx["product_id"]
-        qty = tx["quantity"]
-        tx_type = tx["transaction_type"]
-
-        if tx_type == "RESTOCK":
-            tx_summary[pid]["restock"] += qty
-            tx_summary[pid]["restock_txns"].append(tx)
-        elif tx_type == "ADJUSTMENT":
-            tx_summary[pid]["adjustment"] += qty
-            tx_summary[pid]["adjustment_txns"].append(tx)
-        elif tx_type == "TRANSFER_IN":
-            tx_summary[pid]["transfer_in"] += qty
-
-    for tx in outbound_response.data:
-        pid = tx["product_id"]
-        qty = tx["quantity"]
-        tx_type = tx["transaction_type"]
-
-        if tx_type == "SALE":
-            tx_summary[pid]["sale"] += qty
-        elif tx_type == "TRANSFER_OUT":
-            tx_summary[pid]["transfer_out"] += qty
+    # Aggregate transactions per product; only products with a counted
+    # transaction get an entry
+    tx_summary = {}
+    inbound_count = 0
+    outbound_count = 0
+
+    for row in summary_response.data:
+        direction = row["direction"]
+        if direction == "in":
+            inbound_count += row["tx_count"]
+        else:
+            outbound_count += row["tx_count"]
+
+        # Types that don't apply to a direction (e.g. a TRANSFER_OUT into
+        # this warehouse) have no key and are ignored
+        key = TX_SUMMARY_KEYS.get((direction, row["transaction_type"]))
+        if key is not None:
+            entry = tx_summary.get(row["product_id"])
+            if entry is None:
+                entry = tx_summary[row["product_id"]] = dict(EMPTY_TX_SUMMARY)
+            entry[key] += row["total"]
+
+    print(f"  Found {inbound_count} inbound transactions")
+    print(f"  Found {outbound_count} outbound transactions")
 
     # =========================================================================
     # STEP 4: Parse CSV files
     # =========================================================================
     print("Parsing CSV files...")
 
-    all_csv_items = []
+    # Expected quantities are aggregated as each CSV streams in
+    csv_expected = defaultdict(lambda: {"total": 0, "matched_product": None, "sources": []})
+    csv_unmatched = []
+
     if csv_files:
         for csv_path in csv_files:
-            items = parse_gemini_csv(csv_path)
-            print(f"  {os.path.basename(csv_path)}: {len(items)} items with qty > 0")
-            all_csv_items.extend(items)
+            item_count = 0
+            for item in parse_gemini_csv(csv_path):
+                item_count += 1
+                if not item["sku"]:
+                    csv_unmatched.append({**item, "reason": "Missing SKU"})
+                    continue
+                product = match_sku_to_product(item["sku"], products_by_sku)
+                if product:
+                    csv_expected[product["id"]]["total"] += item["quantity"]
+                    csv_expected[product["id"]]["matched_product"] = product
+                    csv_expected[product["id"]]["sources"].append(f"{item['source']}: {item['quantity']}")
+                else:
+                    csv_unmatched.append(item)
+            print(f"  {os.path.basename(csv_path)}: {item_count} items with qty > 0")
     else:
         print("  No CSV files provided - will show database inventory only")
 
-    # Calculate expected quantities from CSVs
-    csv_expected = defaultdict(lambda: {"total": 0, "matched_product": None, "sources": []})
-    csv_unmatched = []
-
-    for item in all_csv_items:
-        if not item["sku"]:
-            csv_unmatched.append({**item, "reason": "Missing SKU"})
-            continue
-        product = match_sku_to_product(item["sku"], products_by_sku)
-        if product:
-            csv_expected[product["id"]]["total"] += item["quantity"]
-            csv_expected[product["id"]]["matched_product"] = product
-            csv_expected[product["id"]]["sources"].append(f"{item['source']}: {item['quantity']}")
-        else:
-            csv_unmatched.append(item)
-
     # =========================================================================
     # STEP 5: Generate audit report
     # =========================================================================
-    print()
-    print("=" * 70)
-    print("SECTION 1: UNMATCHED CSV ITEMS (Skipped during import)")
-    print("=" * 70)
+    # Report lines are buffered and written once per section
+    out: list[str] = []
+    w = out.append
+
+    w("")
+    w("=" * 70)
+    w("SECTION 1: UNMATCHED CSV ITEMS (Skipped during import)")
+    w("=" * 70)
 
     if csv_unmatched:
-        print(f"\n{len(csv_unmatched)} items from CSV could not be matched to products:\n")
+        w(f"\n{len(csv_unmatched)} items from CSV could not be matched to products:\n")
         for item in csv_unmatched:
             reason = item.get("reason", "SKU not in database")
-            print(f"  [{item['source']}] Row {item['row']}: SKU='{item['sku'] or '(empty)'}' "
+            w(f"  [{item['source']}] Row {item['row']}: SKU='{item['sku'] or '(empty)'}' "
                   f"Name='{item['name']}' Qty={item['quantity']} - {reason}")
     else:
-        print("\nAll CSV items matched successfully!")
-
-    print()
-    print("=" * 70)
-    print("SECTION 2: INVENTORY COMPARISON")
-    print("=" * 70)
-    print()
-    print("Comparing: CSV Expected vs Transaction Totals vs Current Inventory")
-    print()
-    print(f"{'Product':<45} {'CSV':>6} {'TX+':>6} {'TX-':>6} {'NET':>6} {'DB':>6} {'DIFF':>6}")
-    print("-" * 85)
+        w("\nAll CSV items matched successfully!")
+    write_lines(out)
+
+    w("")
+    w("=" * 70)
+    w("SECTION 2: INVENTORY COMPARISON")
+    w("=" * 70)
+    w("")
+    w("Comparing: CSV Expected vs Transaction Totals vs Current Inventory")
+    w("")
+    w(f"{'Product':<45} {'CSV':>6} {'TX+':>6} {'TX-':>6} {'NET':>6} {'DB':>6} {'DIFF':>6}")
+    w("-" * 85)
 
     discrepancies = []
+    # (sort key, table line) per product, ordered before printing
+    comparison_rows = []
 
     # Get all product IDs that appear in CSVs, transactions, or inventory
-    all_product_ids = set(csv_expected.keys()) | set(tx_summary.keys()) | set(current_inventory.keys())
+    all_product_ids = sorted(set().union(csv_expected, tx_summary, current_inventory))
 
-    for pid in sorted(all_product_ids):
+    for pid in all_product_ids:
         product = products_by_id.get(pid)
         if not product:
             continue
 
         csv_total = csv_expected[pid]["total"]
-        tx_in = tx_summary[pid]["restock"] + tx_summary[pid]["adjustment"] + tx_summary[pid]["transfer_in"]
-        tx_out = tx_summary[pid]["sale"] + tx_summary[pid]["transfer_out"]
+        totals = tx_summary.get(pid, EMPTY_TX_SUMMARY)
+        tx_in = totals["restock"] + totals["adjustment"] + totals["transfer_in"]
+        tx_out = totals["sale"] + totals["transfer_out"]
         tx_net = tx_in - tx_out
         db_qty = current_inventory.get(pid, 0)
 
@@ -321,7 +378,10 @@ def main():
 
         if csv_total > 0 or tx_in > 0 or db_qty > 0:
             marker = " !" if has_issue else ""
-            print(f"{product['name'][:44]:<45} {csv_total:>6} {tx_in:>6} {tx_out:>6} {tx_net:>6} {db_qty:>6} {diff_csv_vs_db:>+6}{marker}")
+            comparison_rows.append((
+                (has_issue, abs(diff_csv_vs_db)),
+                f"{product['name'][:44]:<45} {csv_total:>6} {tx_in:>6} {tx_out:>6} {tx_net:>6} {db_qty:>6} {diff_csv_vs_db:>+6}{marker}",
+            ))
 
             if has_issue:
                 discrepancies.append({
@@ -334,125 +394,156 @@ def main():
                     "db_qty": db_qty,
                     "diff_csv_vs_db": diff_csv_vs_db,
                     "diff_tx_vs_db": diff_tx_vs_db,
-                    "tx_detail": tx_summary[pid],
+                    "tx_detail": totals,
                 })
 
-    print()
-    print("Legend: CSV=Expected from imports, TX+=Inbound transactions, TX-=Outbound, NET=TX+ minus TX-, DB=Current qty, DIFF=DB minus CSV")
+    # Flagged rows first, then by size of the CSV difference; the sort is
+    # stable, so ties keep product id order
+    comparison_rows.sort(key=itemgetter(0), reverse=True)
+    for _, line in comparison_rows[:COMPARISON_ROW_LIMIT]:
+        w(line)
+    if len(comparison_rows) > COMPARISON_ROW_LIMIT:
+        w(f"... {len(comparison_rows) - COMPARISON_ROW_LIMIT} more products with smaller differences not shown")
+
+    discrepancies.sort(key=lambda d: abs(d["diff_csv_vs_db"]), reverse=True)
+
+    w("")
+    w("Legend: CSV=Expected from imports, TX+=Inbound transactions, TX-=Outbound, NET=TX+ minus TX-, DB=Current qty, DIFF=DB minus CSV")
+    write_lines(out)
 
     # =========================================================================
     # STEP 6: Detailed discrepancy analysis
     # =========================================================================
     if discrepancies:
-        print()
-        print("=" * 70)
-        print("SECTION 3: DISCREPANCY DETAILS")
-        print("=" * 70)
+        # Individual RESTOCK/ADJUSTMENT rows are only listed for discrepant
+        # products, so only theirs are fetched
+        needed = [d["product"]["id"] for d in discrepancies]
+        detail_txns = defaultdict(list)
+        for chunk in chunked(needed, DETAIL_BATCH_SIZE):
+            detail_response = supabase.table("transactions")\
+                .select("product_id, transaction_type, quantity, reference_note, created_at")\
+                .eq("to_warehouse_id", MAIN_WAREHOUSE_ID)\
+                .in_("transaction_type", ["RESTOCK", "ADJUSTMENT"])\
+                .in_("product_id", chunk)\
+                .execute()
+            for tx in detail_response.data:
+                detail_txns[(tx["product_id"], tx["transaction_type"])].append(tx)
+
+        w("")
+        w("=" * 70)
+        w("SECTION 3: DISCREPANCY DETAILS")
+        w("=" * 70)
 
         for d in discrepancies:
-            print()
-            print(f"PRODUCT: {d['product']['name']}")
-            print(f"  SKU: {d['product']['sku']}")
-            print(f"  Current DB Quantity: {d['db_qty']}")
-            print()
-            print(f"  Expected from CSVs: {d['csv_total']}")
+            w("")
+            w(f"PRODUCT: {d['product']['name']}")
+            w(f"  SKU: {d['product']['sku']}")
+            w(f"  Current DB Quantity: {d['db_qty']}")
+            w("")
+            w(f"  Expected from CSVs: {d['csv_total']}")
             if d['csv_sources']:
                 for source in d['csv_sources']:
-                    print(f"    - {source}")
-            print()
-            print(f"  Transaction History:")
-            print(f"    + RESTOCK: {d['tx_detail']['restock']}")
-            print(f"    + ADJUSTMENT: {d['tx_detail']['adjustment']}")
-            print(f"    + TRANSFER_IN: {d['tx_detail']['transfer_in']}")
-            print(f"    - SALE: {d['tx_detail']['sale']}")
-            print(f"    - TRANSFER_OUT: {d['tx_detail']['transfer_out']}")
-            print(f"    = Net: {d['tx_net']}")
-            print()
+                    w(f"    - {source}")
+            w("")
+            w(f"  Transaction History:")
+            w(f"    + RESTOCK: {d['tx_detail']['restock']}")
+            w(f"    + ADJUSTMENT: {d['tx_detail']['adjustment']}")
+            w(f"    + TRANSFER_IN: {d['tx_detail']['transfer_in']}")
+            w(f"    - SALE: {d['tx_detail']['sale']}")
+            w(f"    - TRANSFER_OUT: {d['tx_detail']['transfer_out']}")
+            w(f"    = Net: {d['tx_net']}")
+            w("")
 
             if d['diff_csv_vs_db'] < 0:
-                print(f"  !  ISSUE: DB has {abs(d['diff_csv_vs_db'])} LESS than CSV expected")
+                w(f"  !  ISSUE: DB has {abs(d['diff_csv_vs_db'])} LESS than CSV expected")
                 if d['tx_net'] < d['csv_total']:
-                    print(f"      -> Possible cause: Import was not run or partially failed")
+                    w(f"      -> Possible cause: Import was not run or partially failed")
             elif d['diff_csv_vs_db'] > 0:
-                print(f"  !  ISSUE: DB has {d['diff_csv_vs_db']} MORE than CSV expected")
+                w(f"  !  ISSUE: DB has {d['diff_csv_vs_db']} MORE than CSV expected")
                 if d['tx_net'] > d['csv_total']:
-                    print(f"      -> Possible cause: Import was run multiple times")
+                    w(f"      -> Possible cause: Import was run multiple times")
 
             if d['diff_tx_vs_db'] != 0:
-                print(f"  !  ISSUE: Transaction net ({d['tx_net']}) != DB qty ({d['db_qty']})")
-                print(f"      -> Data integrity issue: transactions don't match inventory")
+                w(f"  !  ISSUE: Transaction net ({d['tx_net']}) != DB qty ({d['db_qty']})")
+                w(f"      -> Data integrity issue: transactions don't match inventory")
 
             # Show transaction details
-            if d['tx_detail']['restock_txns']:
-                print()
-                print("  RESTOCK Transactions:")
-                for tx in d['tx_detail']['restock_txns']:
-                    print(f"    - {tx['created_at'][:10]}: +{tx['quantity']} ({tx['reference_note']})")
-
-            if d['tx_detail']['adjustment_txns']:
-                print()
-                print("  ADJUSTMENT Transactions:")
-                for tx in d['tx_detail']['adjustment_txns']:
-                    print(f"    - {tx['created_at'][:10]}: +{tx['quantity']} ({tx['reference_note']})")
+            pid = d['product']['id']
+            restock_txns = detail_txns.get((pid, "RESTOCK"))
+            if restock_txns:
+                w("")
+                w("  RESTOCK Transactions:")
+                for tx in restock_txns:
+                    w(f"    - {tx['created_at'][:10]}: +{tx['quantity']} ({tx['reference_note']})")
+
+            adjustment_txns = detail_txns.get((pid, "ADJUSTMENT"))
+            if adjustment_txns:
+                w("")
+                w("  ADJUSTMENT Transactions:")
+                for tx in adjustment_txns:
+                    w(f"    - {tx['created_at'][:10]}: +{tx['quantity']} ({tx['reference_note']})")
+
+        write_lines(out)
 
     # =========================================================================
     # STEP 7: Summary and recommendations
     # =========================================================================
-    print()
-    print("=" * 70)
-    print("SUMMARY")
-    print("=" * 70)
-    print()
-    print(f"Total products in database: {len(products_response.data)}")
-    print(f"Products with inventory: {len(current_inventory)}")
-    print(f"CSV items that matched: {len(csv_expected)}")
-    print(f"CSV items unmatched: {len(csv_unmatched)}")
-    print(f"Products with discrepancies: {len(discrepancies)}")
+    w("")
+    w("=" * 70)
+    w("SUMMARY")
+    w("=" * 70)
+    w("")
+    w(f"Total products in database: {len(products_response.data)}")
+    w(f"Products with inventory: {len(current_inventory)}")
+    w(f"CSV items that matched: {len(csv_expected)}")
+    w(f"CSV items unmatched: {len(csv_unmatched)}")
+    w(f"Products with discrepancies: {len(discrepancies)}")
 
     if csv_unmatched or discrepancies:
-        print()
-        print("RECOMMENDATIONS:")
-        print("-" * 40)
+        w("")
+        w("RECOMMENDATIONS:")
+        w("-" * 40)
 
         if csv_unmatched:
             missing_skus = [item['sku'] for item in csv_unmatched if item.get('sku')]
             missing_nosku = [item for item in csv_unmatched if not item.get('sku')]
 
             if missing_skus:
-                print()
-                print("1. Add missing products to database:")
+                w("")
+                w("1. Add missing products to database:")
                 for sku in set(missing_skus):
-                    print(f"   - SKU: {sku}")
+                    w(f"   - SKU: {sku}")
 
             if missing_nosku:
-                print()
-                print("2. Fix CSV rows with missing SKUs:")
+                w("")
+                w("2. Fix CSV rows with missing SKUs:")
                 for item in missing_nosku:
-                    print(f"   - Row {item['row']}: {item['name']} (qty: {item['quantity']})")
+                    w(f"   - Row {item['row']}: {item['name']} (qty: {item['quantity']})")
 
         if discrepancies:
             under_imported = [d for d in discrepancies if d['diff_csv_vs_db'] < 0]
             over_imported = [d for d in discrepancies if d['diff_csv_vs_db'] > 0]
 
             if under_imported:
-                print()
-                print("3. Products with LESS stock than expected - may need re-import:")
+                w("")
+                w("3. Products with LESS stock than expected - may need re-import:")
                 for d in under_imported:
-                    print(f"   - {d['product']['sku']}: expected {d['csv_total']}, have {d['db_qty']}")
+                    w(f"   - {d['product']['sku']}: expected {d['csv_total']}, have {d['db_qty']}")
 
             if over_imported:
-                print()
-                print("4. Products with MORE stock than expected - may have duplicate imports:")
+                w("")
+                w("4. Products with MORE stock than expected - may have duplicate imports:")
                 for d in over_imported:
-                    print(f"   - {d['product']['sku']}: expected {d['csv_total']}, have {d['db_qty']}")
+                    w(f"   - {d['product']['sku']}: expected {d['csv_total']}, have {d['db_qty']}")
     else:
-        print()
-        print("No discrepancies found! Inventory matches expected values.")
-
-    print()
-    print("=" * 70)
-    print("END OF AUDIT REPORT")
-    print("=" * 70)
+        w("")
+        w("No discrepancies found! Inventory matches expected values.")
+
+    w("")
+    w("=" * 70)
+    w("END OF AUDIT REPORT")
+    w("=" * 70)
+    write_lines(out)
 
 
 if __name__ == "__main__":
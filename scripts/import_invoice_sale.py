@@ -10,16 +10,17 @@ Examples:
 This script will:
 1. Read the CSV file with invoice items (Product Code, Quantity, Unit Price)
 2. Match products by SKU (with normalization)
-3. Create an invoice in DRAFT status
-4. Confirm the invoice (reserves stock via RPC)
-5. Optionally record a partial payment
-6. Report results
+3. Create and confirm the invoice, reserving stock, in one RPC call
+4. Optionally record a partial payment in the same transaction
+5. Report results
 """
 
 import argparse
 import csv
 import os
+import re
 import sys
+from functools import lru_cache
 
 from dotenv import load_dotenv
 from supabase import create_client, Client
@@ -37,47 +38,72 @@ CARPROOFING_WAREHOUSE_ID = "00000000-0000-0000-0000-000000000002"
 # SKUs to skip (TBD items)
 SKIP_SKUS = {"NAM-TE380B"}
 
+# Currency prefix ("Rs", "Rs.", "RS", "PKR") and thousands separators in prices
+_PRICE_PREFIX_RE = re.compile(r"^(?:rs\.?|pkr)\s*", re.IGNORECASE)
+_PRICE_SEPARATOR_RE = re.compile(r"[,\s]")
 
+
+@lru_cache(maxsize=4096)
 def normalize_sku(sku: str) -> str:
     """Normalize SKU for matching (same logic as import_purchases.py)."""
     return sku.strip().upper().replace(" ", "-").replace("_", "-")
 
 
-def create_sku_variations(sku: str) -> list[str]:
+@lru_cache(maxsize=4096)
+def create_sku_variations(sku: str) -> tuple[str, ...]:
     """Create multiple SKU variations to try matching."""
-    normalized = normalize_sku(sku)
-    return [
-        sku.strip(),
-        sku.strip().upper(),
+    stripped = sku.strip()
+    normalized = normalize_sku(stripped)
+    return (
+        stripped,
+        stripped.upper(),
         normalized,
         normalized.replace("-", "_"),
         normalized.replace("-", ""),
-    ]
+    )
+
+
+def iter_sku_keys(products: list[dict]):
+    """Yield (lookup key, product) pairs for every SKU variant of each product."""
+    for p in products:
+        normalized = normalize_sku(p["sku"])
+        yield p["sku"], p
+        yield p["sku"].upper(), p
+        yield normalized, p
+        yield normalized.replace("-", "_"), p
+        yield normalized.replace("-", ""), p
+
+
+def match_sku_to_product(sku: str, products_by_sku: dict) -> dict | None:
+    """
+    Try to match a SKU to a product using variations.
+    The plain and uppercased SKU are tried first (the common case); the
+    normalized variations are only built when neither matches.
+    """
+    stripped = sku.strip()
+    product = products_by_sku.get(stripped) or products_by_sku.get(stripped.upper())
+    if product:
+        return product
+
+    for variation in create_sku_variations(sku)[2:]:
+        if variation in products_by_sku:
+            return products_by_sku[variation]
+    return None
 
 
 def parse_price(price_str: str) -> float:
     """Parse price string like 'Rs 3,800' or '3800' to float."""
-    cleaned = price_str.strip()
-    for prefix in ("Rs ", "Rs. ", "RS ", "PKR ", "Rs", "PKR"):
-        if cleaned.startswith(prefix):
-            cleaned = cleaned[len(prefix):]
-            break
-    cleaned = cleaned.replace(",", "").strip()
-    return float(cleaned)
+    cleaned = _PRICE_PREFIX_RE.sub("", price_str.strip())
+    return float(_PRICE_SEPARATOR_RE.sub("", cleaned))
 
 
 def lookup_user_id(supabase: Client, email: str) -> str | None:
-    """Look up a user's UUID by email using the admin API."""
+    """Look up a user's UUID by email (get_user_id_by_email RPC, migration 031)."""
     try:
-        response = supabase.auth.admin.list_users()
-        users = response if isinstance(response, list) else getattr(response, "users", [])
-        for u in users:
-            user_email = u.email if hasattr(u, "email") else u.get("email")
-            user_id = u.id if hasattr(u, "id") else u.get("id")
-            if user_email == email:
-                return user_id
+        response = supabase.rpc("get_user_id_by_email", {"p_email": email}).execute()
+        return response.data or None
     except Exception as e:
-        print(f"WARNING: Could not list users: {e}")
+        print(f"WARNING: Could not look up user: {e}")
     return None
 
 
@@ -120,13 +146,7 @@ def main():
     # Load products
     print("Loading products from database...")
     products_response = supabase.table("products").select("id, sku, name, retail_price").execute()
-    products_by_sku: dict[str, dict] = {}
-    for p in products_response.data:
-        products_by_sku[p["sku"]] = p
-        products_by_sku[p["sku"].upper()] = p
-        products_by_sku[normalize_sku(p["sku"])] = p
-        products_by_sku[normalize_sku(p["sku"]).replace("-", "_")] = p
-        products_by_sku[normalize_sku(p["sku"]).replace("-", "")] = p
+    products_by_sku: dict[str, dict] = dict(iter_sku_keys(products_response.data))
     print(f"Loaded {len(products_response.data)} products")
 
     # Normalize skip SKUs
@@ -175,11 +195,7 @@ def main():
                 continue
 
             # Match product
-            product = None
-            for variation in create_sku_variations(sku):
-                if variation in products_by_sku:
-                    product = products_by_sku[variation]
-                    break
+            product = match_sku_to_product(sku, products_by_sku)
 
             if not product:
                 skipped.append((sku, description, quantity))
@@ -224,8 +240,9 @@ def main():
                 print(f"  * {sku}: {desc} (qty: {qty})")
         return
 
-    # Create invoice
-    print("\nCreating invoice...")
+    # Create, confirm and pay the invoice in one transaction
+    # (create_invoice_with_items_and_payment, migration 030)
+    print("\nCreating and confirming invoice (reserving stock)...")
     invoice_data = {
         "warehouse_id": args.warehouse_id,
         "customer_name": args.customer,
@@ -233,84 +250,43 @@ def main():
         "subtotal": subtotal,
         "discount": 0,
         "total": subtotal,
-        "status": "DRAFT",
-        "created_by": user_id,
     }
-
-    invoice_resp = supabase.table("invoices").insert(invoice_data).execute()
-    if not invoice_resp.data or len(invoice_resp.data) == 0:
-        print("ERROR: Failed to create invoice")
-        sys.exit(1)
-
-    invoice = invoice_resp.data[0]
-    invoice_id = invoice["id"]
-    print(f"Invoice created: {invoice['invoice_number']} (ID: {invoice_id})")
-
-    # Insert invoice items
-    print("Adding invoice items...")
     invoice_items = [
         {
-            "invoice_id": invoice_id,
             "product_id": item["product_id"],
             "quantity": item["quantity"],
             "unit_price": item["unit_price"],
-            "line_total": item["quantity"] * item["unit_price"],
         }
         for item in items
     ]
+    payment_data = {
+        "amount": payment_amount,
+        "payment_method": "cash",
+        "reference_note": f"Initial partial payment - {args.customer}",
+    } if payment_amount > 0 else None
 
-    items_resp = supabase.table("invoice_items").insert(invoice_items).execute()
-    if not items_resp.data:
-        print("ERROR: Failed to insert invoice items")
-        supabase.table("invoices").delete().eq("id", invoice_id).execute()
-        sys.exit(1)
-    print(f"Added {len(invoice_items)} items")
-
-    # Confirm invoice (reserves stock)
-    print("\nConfirming invoice (reserving stock)...")
     try:
-        confirm_resp = supabase.rpc("confirm_invoice", {
-            "p_invoice_id": invoice_id,
+        invoice_resp = supabase.rpc("create_invoice_with_items_and_payment", {
+            "p_invoice": invoice_data,
+            "p_items": invoice_items,
+            "p_payment": payment_data,
             "p_user_id": user_id,
         }).execute()
-
-        if confirm_resp.data is not None:
-            print("Invoice confirmed, stock reserved")
-        else:
-            print("WARNING: confirm_invoice may have failed. Check invoice status.")
     except Exception as e:
-        print(f"ERROR: Failed to confirm invoice: {e}")
-        print("Invoice remains in DRAFT status. Confirm manually if needed.")
+        print(f"ERROR: Failed to create invoice: {e}")
+        print("Nothing was saved.")
         sys.exit(1)
 
-    # Record partial payment
-    if payment_amount > 0:
-        print(f"\nRecording payment of Rs {payment_amount:,.2f}...")
-        payment_resp = supabase.table("payments").insert({
-            "invoice_id": invoice_id,
-            "amount": payment_amount,
-            "payment_method": "cash",
-            "reference_note": f"Initial partial payment - {args.customer}",
-            "recorded_by": user_id,
-        }).execute()
-
-        if payment_resp.data:
-            print("Payment recorded")
-        else:
-            print("WARNING: Failed to record payment")
-
-        # Update invoice status
-        new_balance = subtotal - payment_amount
-        new_status = "PAID" if new_balance <= 0 else "PARTIALLY_PAID"
-
-        supabase.table("invoices").update({
-            "amount_paid": payment_amount,
-            "balance_due": max(0, new_balance),
-            "status": new_status,
-            **({"paid_at": "now()"} if new_status == "PAID" else {}),
-        }).eq("id", invoice_id).execute()
+    invoice = invoice_resp.data[0] if isinstance(invoice_resp.data, list) else invoice_resp.data
+    if not invoice:
+        print("ERROR: Failed to create invoice")
+        sys.exit(1)
 
-        print(f"Invoice status: {new_status}")
+    print(f"Invoice created: {invoice['invoice_number']} (ID: {invoice['id']})")
+    print(f"Added {len(invoice_items)} items, stock reserved")
+    if payment_amount > 0:
+        print(f"Payment of Rs {payment_amount:,.2f} recorded")
+        print(f"Invoice status: {invoice['status']}")
 
     # Final summary
     balance = max(0, subtotal - payment_amount) if payment_amount > 0 else subtotal
@@ -6,14 +6,16 @@ Examples:
   python scripts/import_purchases.py "./purchases.csv" "January 31, 2026"
   python scripts/import_purchases.py "./Gemini Export.csv"
   python scripts/import_purchases.py "./purchases.csv" --po-number PO-123 --vendor "Acme Corp" --bill-date 2026-01-31
+  python scripts/import_purchases.py "./purchases.csv" --fuzzy
+  python scripts/import_purchases.py "./purchases.csv" --products-cache ./.products_cache.json
 
 This script will:
 1. Read the CSV file with purchase data
-2. Create a purchase batch (if batch metadata provided)
-3. Match products by SKU (with normalization)
-4. Increment inventory in Main Warehouse
-5. Create RESTOCK transactions for each item (linked to batch)
-6. Report any unmatched SKUs
+2. Match products by SKU (with normalization)
+3. Create the purchase batch (if batch metadata provided), increment
+   inventory in Main Warehouse and create RESTOCK transactions for each
+   item (linked to the batch) in one atomic RPC call
+4. Report any unmatched SKUs
 
 Batch metadata can be provided via:
 - CSV columns: PO Number, Vendor Bill Number, Vendor Name, Bill Date (from first row)
@@ -21,24 +23,48 @@ Batch metadata can be provided via:
 """
 
 import argparse
+import bisect
 import csv
+import json
 import os
+import re
 import sys
 from datetime import datetime
+from difflib import get_close_matches
+from itertools import chain
 
-from dotenv import load_dotenv
-from supabase import create_client, Client
+from supabase import Client
 
-# Load environment variables from .env file in scripts directory or project root
-load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
-load_dotenv()  # Also try project root
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+from _supabase import get_client
 
 # Main Warehouse UUID (from seed.sql)
 MAIN_WAREHOUSE_ID = "00000000-0000-0000-0000-000000000001"
 
+# Read buffer for the CSV file (fewer read() calls on large exports)
+READ_BUFFER_SIZE = 1 << 20
+
+# Optional CSV columns carrying purchase batch metadata (read from the first row)
+BATCH_COLUMNS = ("PO Number", "Vendor Bill Number", "Vendor Name", "Bill Date")
+
+# Minimum similarity (0-1) for --fuzzy SKU matches
+FUZZY_CUTOFF = 0.9
+
+# Key prefix length and number of suggestions shown for skipped SKUs
+SUGGEST_PREFIX_LEN = 4
+SUGGEST_LIMIT = 5
+
+# Date shapes accepted by parse_date, each with the strptime formats to try
+_DATE_FORMATS = (
+    (re.compile(r"\d{4}-\d{1,2}-\d{1,2}"), ("%Y-%m-%d",)),
+    (re.compile(r"\d{1,2}/\d{1,2}/\d{4}"), ("%m/%d/%Y", "%d/%m/%Y")),
+    (re.compile(r"[A-Za-z]+\.? \d{1,2}, \d{4}"), ("%B %d, %Y", "%b %d, %Y")),
+)
+
+# Spaces and underscores both normalize to hyphens
+_SKU_TR = str.maketrans({" ": "-", "_": "-"})
+# Lookup keys drop every separator
+_SKU_KEY_TR = str.maketrans("", "", " _-")
+
 
 def normalize_sku(sku: str) -> str:
     """
@@ -48,35 +74,129 @@ def normalize_sku(sku: str) -> str:
     - TVD 104 16 vs TVD_104_16
     - Case differences
     """
-    return sku.strip().upper().replace(" ", "-").replace("_", "-")
+    return sku.strip().upper().translate(_SKU_TR)
+
+
+def sku_key(sku: str) -> str:
+    """
+    Loose lookup key for SKU matching: the normalized SKU with separators
+    removed, so TVD_109_16, TVD-109-16 and TVD 109 16 share one key.
+    Distinct SKUs can share it too (AB-12 vs AB12); see build_sku_index.
+    """
+    return sku.strip().upper().translate(_SKU_KEY_TR)
+
+
+def _unique_index(products: list[dict], key_of) -> tuple[dict, dict]:
+    """
+    Map key_of(sku) to its product, leaving out keys shared by several
+    products. Returns (index, collisions) with collisions as key -> SKUs.
+    """
+    grouped = {}
+    for p in products:
+        grouped.setdefault(key_of(p["sku"]), []).append(p)
+    index = {key: group[0] for key, group in grouped.items() if len(group) == 1}
+    collisions = {key: [p["sku"] for p in group] for key, group in grouped.items() if len(group) > 1}
+    return index, collisions
 
 
-def create_sku_variations(sku: str) -> list[str]:
+def build_sku_index(products: list[dict]) -> tuple[dict, dict, list[list[str]]]:
     """
-    Create multiple SKU variations to try matching.
+    Index products for match_product.
+    Returns (by_exact, by_key, ambiguous): by_exact maps the stripped,
+    uppercased SKU to its product and by_key maps sku_key() to its product.
+    A key shared by more than one product is left out of its index, and the
+    SKUs sharing it are listed in ambiguous, instead of one product silently
+    replacing the other.
     """
-    normalized = normalize_sku(sku)
-    return [
-        sku.strip(),  # Original
-        sku.strip().upper(),  # Uppercase original
-        normalized,  # Normalized (dashes)
-        normalized.replace("-", "_"),  # With underscores
-        normalized.replace("-", ""),  # No separators
-    ]
+    by_exact, exact_collisions = _unique_index(products, lambda s: s.strip().upper())
+    by_key, key_collisions = _unique_index(products, sku_key)
+    ambiguous = [*exact_collisions.values()]
+    ambiguous += [skus for skus in key_collisions.values() if skus not in ambiguous]
+    return by_exact, by_key, ambiguous
+
+
+def match_product(sku: str, by_exact: dict, by_key: dict) -> dict | None:
+    """
+    Match a CSV SKU to a product: the exact (case-insensitive) SKU first,
+    then the separator-free key.
+    """
+    return by_exact.get(sku.strip().upper()) or by_key.get(sku_key(sku))
+
+
+def suggest_skus(sku: str, sorted_keys: list[str], products_by_sku: dict) -> list[str]:
+    """
+    Product SKUs sharing the first SUGGEST_PREFIX_LEN key characters with sku.
+    sorted_keys is the sorted list of products_by_sku keys, so the matches are
+    one contiguous run found by binary search.
+    """
+    prefix = sku_key(sku)[:SUGGEST_PREFIX_LEN]
+    if not prefix:
+        return []
+    suggestions = []
+    for key in sorted_keys[bisect.bisect_left(sorted_keys, prefix):]:
+        if not key.startswith(prefix) or len(suggestions) >= SUGGEST_LIMIT:
+            break
+        suggestions.append(products_by_sku[key]["sku"])
+    return suggestions
 
 
 def parse_date(s: str) -> str | None:
     """Parse date string to YYYY-MM-DD format."""
-    if not s or not s.strip():
-        return None
-    for fmt in ("%Y-%m-%d", "%m/%d/%Y", "%d/%m/%Y", "%B %d, %Y", "%b %d, %Y"):
-        try:
-            return datetime.strptime(s.strip(), fmt).strftime("%Y-%m-%d")
-        except ValueError:
+    s = s.strip() if s else ""
+    for pattern, formats in _DATE_FORMATS:
+        if not pattern.fullmatch(s):
             continue
+        for fmt in formats:
+            try:
+                return datetime.strptime(s, fmt).strftime("%Y-%m-%d")
+            except ValueError:
+                continue
+        return None
     return None
 
 
+def load_products(supabase: Client, cache_path: str | None) -> tuple[list[dict], str]:
+    """
+    Load the products used for SKU matching.
+    Returns (products, source) where source says where they came from.
+    With a cache path, the product list is stored on disk alongside the
+    table's row count and latest updated_at, and is only re-downloaded
+    when that (cheap) probe no longer matches.
+    """
+    columns = "id, sku, name, cost_price"
+    if not cache_path:
+        return supabase.table("products").select(columns).execute().data, "database"
+
+    count = supabase.table("products").select("id", count="exact").limit(0).execute().count
+    # updated_at is nullable and DESC sorts NULLs first, so skip them or a
+    # single NULL would hide every later edit
+    latest = (
+        supabase.table("products")
+        .select("updated_at")
+        .not_.is_("updated_at", "null")
+        .order("updated_at", desc=True)
+        .limit(1)
+        .execute()
+    )
+    fingerprint = [count, latest.data[0]["updated_at"] if latest.data else None]
+
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("fingerprint") == fingerprint:
+            return cached["products"], f"cache {cache_path}"
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    products = supabase.table("products").select(columns).execute().data
+    try:
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "products": products}, f)
+    except OSError as e:
+        print(f"WARNING: Could not write products cache: {e}")
+    return products, "database"
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Import purchases from CSV file into Main Warehouse."
@@ -92,6 +212,15 @@ def main():
     parser.add_argument("--vendor-bill", help="Vendor bill number for batch")
     parser.add_argument("--vendor-name", "--vendor", dest="vendor_name", help="Vendor/supplier name for batch")
     parser.add_argument("--bill-date", help="Bill date (YYYY-MM-DD or similar) for batch")
+    parser.add_argument(
+        "--fuzzy",
+        action="store_true",
+        help=f"Fall back to the closest product SKU (similarity >= {FUZZY_CUTOFF}) for unmatched rows",
+    )
+    parser.add_argument(
+        "--products-cache",
+        help="Cache products in this JSON file between runs (refreshed when products change)",
+    )
     args = parser.parse_args()
 
     csv_path = args.csv_file
@@ -108,82 +237,76 @@ def main():
     if not os.path.isabs(csv_path):
         csv_path = os.path.join(os.getcwd(), csv_path)
 
-    if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
-        print("ERROR: Missing SUPABASE_URL or SUPABASE_SERVICE_KEY in environment")
-        sys.exit(1)
-
     print("Connecting to Supabase...")
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
-
-    batch_id = None
-    if any(batch_meta.values()):
-        print("Creating purchase batch...")
-        batch_row = {
-            "warehouse_id": MAIN_WAREHOUSE_ID,
-            "po_number": batch_meta.get("po_number"),
-            "vendor_bill_number": batch_meta.get("vendor_bill_number"),
-            "vendor_name": batch_meta.get("vendor_name"),
-            "bill_date": batch_meta.get("bill_date"),
-        }
-        batch_resp = supabase.table("purchase_batches").insert(batch_row).execute()
-        if batch_resp.data and len(batch_resp.data) > 0:
-            batch_id = batch_resp.data[0]["id"]
-            print(f"  Batch created: {batch_id}")
+    supabase = get_client()
 
     # Load all products for SKU matching
-    print("Loading products from database...")
-    products_response = supabase.table("products").select("id, sku, name, cost_price").execute()
-
-    # Create multiple lookup keys for each product
-    products_by_sku = {}
-    for p in products_response.data:
-        # Add original and normalized versions
-        products_by_sku[p["sku"]] = p
-        products_by_sku[p["sku"].upper()] = p
-        products_by_sku[normalize_sku(p["sku"])] = p
-        products_by_sku[normalize_sku(p["sku"]).replace("-", "_")] = p
-        products_by_sku[normalize_sku(p["sku"]).replace("-", "")] = p
-
-    print(f"Loaded {len(products_response.data)} products from database")
+    print("Loading products...")
+    products, products_source = load_products(supabase, args.products_cache)
+
+    # Exact SKUs first, then one separator-free key per product
+    products_by_exact, products_by_sku, ambiguous = build_sku_index(products)
+    sku_choices = list(products_by_sku) if args.fuzzy else None
+
+    print(f"Loaded {len(products)} products from {products_source}")
+    if ambiguous:
+        print(f"WARNING: {len(ambiguous)} groups of products have SKUs that normalize alike.")
+        print("CSV rows for these match only by exact SKU and are otherwise skipped:")
+        for skus in ambiguous:
+            print(f"  ! {', '.join(skus)}")
     print(f"CSV file: {csv_path}")
     print(f"Purchase date: {purchase_date}")
     print()
 
     # Read CSV
-    if not os.path.exists(csv_path):
+    try:
+        f = open(csv_path, "r", encoding="utf-8", newline="", buffering=READ_BUFFER_SIZE)
+    except FileNotFoundError:
         print(f"ERROR: CSV file not found at {csv_path}")
         sys.exit(1)
 
     imported = 0
     skipped = []
+    # (csv sku, matched product sku) for rows matched by --fuzzy
+    fuzzy = []
     errors = []
+    # (row_num, sku, product, quantity, description) for every matched row
+    matched = []
 
-    with open(csv_path, "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-
-        for row_num, row in enumerate(reader, start=2):  # Start at 2 (header is row 1)
-            sku = row.get("Product Code", "").strip()
-            qty_str = row.get("Qty", "0").strip()
-            description = row.get("Item Description", "").strip()
-
-            if not sku or not qty_str:
+    with f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        try:
+            idx_sku = header.index("Product Code")
+            idx_qty = header.index("Qty")
+            idx_desc = header.index("Item Description")
+        except ValueError:
+            print(f"ERROR: {csv_path} is missing Product Code, Qty or Item Description columns")
+            sys.exit(1)
+        min_len = max(idx_sku, idx_qty, idx_desc) + 1
+        batch_cols = {name: header.index(name) for name in BATCH_COLUMNS if name in header}
+
+        # Without command-line batch metadata, take it from the first data row
+        first_row = next(reader, None)
+        if first_row and not any(batch_meta.values()) and batch_cols:
+            batch_vals = {name: first_row[i].strip() for name, i in batch_cols.items() if i < len(first_row)}
+            batch_meta = {
+                "po_number": batch_vals.get("PO Number") or None,
+                "vendor_bill_number": batch_vals.get("Vendor Bill Number") or None,
+                "vendor_name": batch_vals.get("Vendor Name") or None,
+                "bill_date": parse_date(batch_vals.get("Bill Date", "")),
+            }
+
+        rows = reader if first_row is None else chain([first_row], reader)
+        for row_num, row in enumerate(rows, start=2):  # Start at 2 (header is row 1)
+            if len(row) < min_len:
+                continue
+            sku = row[idx_sku].strip()
+            if not sku:
+                continue
+            qty_str = row[idx_qty].strip()
+            if not qty_str:
                 continue
-
-            if row_num == 2 and not batch_id and any(
-                row.get(k) for k in ("PO Number", "Vendor Bill Number", "Vendor Name", "Bill Date")
-            ):
-                batch_row = {
-                    "warehouse_id": MAIN_WAREHOUSE_ID,
-                    "po_number": row.get("PO Number", "").strip() or None,
-                    "vendor_bill_number": row.get("Vendor Bill Number", "").strip() or None,
-                    "vendor_name": row.get("Vendor Name", "").strip() or None,
-                    "bill_date": parse_date(row.get("Bill Date", "")) if row.get("Bill Date") else None,
-                }
-                if any(batch_row.get(k) for k in ("po_number", "vendor_bill_number", "vendor_name", "bill_date")):
-                    batch_resp = supabase.table("purchase_batches").insert(batch_row).execute()
-                    if batch_resp.data and len(batch_resp.data) > 0:
-                        batch_id = batch_resp.data[0]["id"]
-                        print(f"  Batch created from CSV: {batch_id}")
 
             try:
                 quantity = int(qty_str)
@@ -194,56 +317,52 @@ def main():
             if quantity <= 0:
                 continue
 
-            product = None
-            for variation in create_sku_variations(sku):
-                if variation in products_by_sku:
-                    product = products_by_sku[variation]
-                    break
+            # Only rows that will be imported or reported need the description
+            description = row[idx_desc].strip()
+            product = match_product(sku, products_by_exact, products_by_sku)
+
+            if not product and sku_choices:
+                close = get_close_matches(sku_key(sku), sku_choices, n=1, cutoff=FUZZY_CUTOFF)
+                if close:
+                    product = products_by_sku[close[0]]
+                    fuzzy.append((sku, product["sku"]))
 
             if not product:
                 skipped.append((sku, description, quantity))
                 continue
 
-            try:
-                inventory = supabase.table("inventory_items")\
-                    .select("*")\
-                    .eq("warehouse_id", MAIN_WAREHOUSE_ID)\
-                    .eq("product_id", product["id"])\
-                    .execute()
-
-                if inventory.data and len(inventory.data) > 0:
-                    new_qty = inventory.data[0]["quantity_on_hand"] + quantity
-                    supabase.table("inventory_items")\
-                        .update({"quantity_on_hand": new_qty})\
-                        .eq("id", inventory.data[0]["id"])\
-                        .execute()
-                else:
-                    new_qty = quantity
-                    supabase.table("inventory_items").insert({
-                        "warehouse_id": MAIN_WAREHOUSE_ID,
-                        "product_id": product["id"],
-                        "quantity_on_hand": new_qty,
-                    }).execute()
-
-                tx_payload = {
-                    "transaction_type": "RESTOCK",
-                    "product_id": product["id"],
-                    "from_warehouse_id": None,
-                    "to_warehouse_id": MAIN_WAREHOUSE_ID,
-                    "quantity": quantity,
-                    "unit_price": product.get("cost_price"),
-                    "reference_note": f"Purchase: {purchase_date} - {description}",
-                }
-                if batch_id:
-                    tx_payload["batch_id"] = batch_id
+            matched.append((row_num, sku, product, quantity, description))
 
-                supabase.table("transactions").insert(tx_payload).execute()
-
-                imported += 1
-                print(f"  + Imported: {sku} -> {product['name']} x {quantity}")
-
-            except Exception as e:
-                errors.append(f"Row {row_num}: Failed to import {sku}: {str(e)}")
+    # Create the batch, record every RESTOCK and add the stock in one
+    # transaction (import_purchase_batch, migration 032); a failure rolls
+    # back the whole import, batch included
+    if matched:
+        ref_prefix = f"Purchase: {purchase_date} - "
+        try:
+            result = supabase.rpc("import_purchase_batch", {
+                "p_warehouse_id": MAIN_WAREHOUSE_ID,
+                "p_items": [
+                    {
+                        "product_id": product["id"],
+                        "quantity": quantity,
+                        "unit_price": product.get("cost_price"),
+                        "reference_note": ref_prefix + description,
+                    }
+                    for _, _, product, quantity, description in matched
+                ],
+                "p_batch": batch_meta if any(batch_meta.values()) else None,
+            }).execute()
+        except Exception as e:
+            errors.append(f"Failed to import {len(matched)} items, nothing was saved: {str(e)}")
+        else:
+            imported = len(matched)
+            batch_id = result.data[0]["batch_id"] if result.data else None
+            if batch_id:
+                print(f"  Batch created: {batch_id}")
+            sys.stdout.write("".join(
+                f"  + Imported: {sku} -> {product['name']} x {quantity}\n"
+                for _, sku, product, quantity, _ in matched
+            ))
 
     # Print summary
     print()
@@ -251,15 +370,28 @@ def main():
     print("IMPORT COMPLETE")
     print("=" * 50)
     print(f"Successfully imported: {imported} items")
+    if fuzzy and imported:
+        print(f"Fuzzy matched (included above): {len(fuzzy)} items")
     print(f"Skipped (product not found): {len(skipped)} items")
     print(f"Errors: {len(errors)}")
 
+    if fuzzy and imported:
+        print()
+        print("FUZZY MATCHES (check these were intended):")
+        print("-" * 50)
+        for sku, matched_sku in fuzzy:
+            print(f"  ~ {sku} -> {matched_sku}")
+
     if skipped:
         print()
         print("SKIPPED ITEMS (products not in database):")
         print("-" * 50)
+        sorted_keys = sorted(products_by_sku)
         for sku, desc, qty in skipped:
             print(f"  * {sku}: {desc} (qty: {qty})")
+            suggestions = suggest_skus(sku, sorted_keys, products_by_sku)
+            if suggestions:
+                print(f"      similar SKUs: {', '.join(suggestions)}")
         print()
         print("To import these, first add the products to the database,")
         print("then re-run this script.")
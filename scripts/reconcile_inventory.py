@@ -9,15 +9,19 @@ Examples:
 This script will:
 1. Read the CSV file with inventory data
 2. Match products by SKU (with normalization)
-3. ADD quantities to existing inventory in Main Warehouse
-4. Create ADJUSTMENT transactions for each item
-5. Report any unmatched SKUs
+3. ADD quantities to Main Warehouse inventory and create ADJUSTMENT
+   transactions for each item in one atomic RPC call (reconcile_inventory,
+   migration 028)
+4. Report any unmatched SKUs
 """
 
 import csv
 import os
 import sys
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from operator import itemgetter
 
 from dotenv import load_dotenv
 from supabase import create_client, Client
@@ -32,26 +36,67 @@ SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 # Main Warehouse UUID (from seed.sql)
 MAIN_WAREHOUSE_ID = "00000000-0000-0000-0000-000000000001"
 
+# SKU, name and quantity columns of a CSV data row
+get_item_fields = itemgetter(3, 4, 5)
 
+# Spaces and underscores both normalize to hyphens
+_SKU_TR = str.maketrans({" ": "-", "_": "-"})
+
+
+@lru_cache(maxsize=4096)
 def normalize_sku(sku: str) -> str:
     """
     Normalize SKU for matching.
     """
-    return sku.strip().upper().replace(" ", "-").replace("_", "-")
+    return sku.strip().upper().translate(_SKU_TR)
 
 
-def create_sku_variations(sku: str) -> list[str]:
+@lru_cache(maxsize=4096)
+def create_sku_variations(sku: str) -> tuple[str, ...]:
     """
     Create multiple SKU variations to try matching.
+    Cached, since reconciliation CSVs often repeat the same SKU.
     """
-    normalized = normalize_sku(sku)
-    return [
-        sku.strip(),
-        sku.strip().upper(),
+    stripped = sku.strip()
+    normalized = normalize_sku(stripped)
+    return (
+        stripped,
+        stripped.upper(),
         normalized,
         normalized.replace("-", "_"),
         normalized.replace("-", ""),
-    ]
+    )
+
+
+def iter_sku_keys(products: list[dict]):
+    """
+    Yield (lookup key, product id) pairs for every SKU variant of each product.
+    Later pairs win on collisions, same as assigning them in order.
+    """
+    for p in products:
+        normalized = normalize_sku(p["sku"])
+        yield p["sku"], p["id"]
+        yield p["sku"].upper(), p["id"]
+        yield normalized, p["id"]
+        yield normalized.replace("-", "_"), p["id"]
+        yield normalized.replace("-", ""), p["id"]
+
+
+def find_product_id(sku: str, product_ids_by_sku: dict[str, str]) -> str | None:
+    """
+    Match a CSV SKU against the SKU alias index and return the product id.
+    Tries the plain and uppercased SKU first (the common case) and only
+    builds the normalized variations when neither matches.
+    """
+    stripped = sku.strip()
+    product_id = product_ids_by_sku.get(stripped) or product_ids_by_sku.get(stripped.upper())
+    if product_id:
+        return product_id
+
+    for variation in create_sku_variations(sku)[2:]:
+        if variation in product_ids_by_sku:
+            return product_ids_by_sku[variation]
+    return None
 
 
 def parse_csv(csv_path: str) -> list[dict]:
@@ -60,32 +105,34 @@ def parse_csv(csv_path: str) -> list[dict]:
     """
     items = []
 
-    with open(csv_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-
-    # Data starts at row 13 (index 12), columns are at index 3,4,5
-    for i, line in enumerate(lines[12:], start=13):  # Skip first 12 rows
-        parts = line.strip().split(",")
-        if len(parts) >= 6:
-            sku = parts[3].strip()
-            name = parts[4].strip()
-            qty_str = parts[5].strip()
-
-            if not qty_str:
-                continue
-
-            try:
-                qty = int(qty_str)
-            except ValueError:
-                continue
-
-            if qty > 0:  # Skip zero quantities
-                items.append({
-                    "row": i,
-                    "sku": sku,
-                    "name": name,
-                    "quantity": qty,
-                })
+    with open(csv_path, "r", newline="", encoding="utf-8") as f:
+        # Skip the first 12 lines on the file iterator, before any CSV parsing
+        reader = csv.reader(islice(f, 12, None))
+
+        # Data starts at row 13, columns are at index 3,4,5
+        for i, parts in enumerate(reader, start=13):
+            if len(parts) >= 6:
+                # The name is only shown for skipped rows, so it's kept
+                # unstripped here and cleaned up in the report
+                sku, name, qty_str = get_item_fields(parts)
+                sku = sku.strip()
+                qty_str = qty_str.strip()
+
+                if not qty_str:
+                    continue
+
+                try:
+                    qty = int(qty_str)
+                except ValueError:
+                    continue
+
+                if qty > 0:  # Skip zero quantities
+                    items.append({
+                        "row": i,
+                        "sku": sku,
+                        "name": name,
+                        "quantity": qty,
+                    })
 
     return items
 
@@ -120,16 +167,10 @@ def main():
 
     # Load all products for SKU matching
     print("Loading products from database...")
-    products_response = supabase.table("products").select("id, sku, name").execute()
+    products_response = supabase.table("products").select("id, sku").execute()
 
-    # Create multiple lookup keys for each product
-    products_by_sku = {}
-    for p in products_response.data:
-        products_by_sku[p["sku"]] = p
-        products_by_sku[p["sku"].upper()] = p
-        products_by_sku[normalize_sku(p["sku"])] = p
-        products_by_sku[normalize_sku(p["sku"]).replace("-", "_")] = p
-        products_by_sku[normalize_sku(p["sku"]).replace("-", "")] = p
+    # Map every SKU variant to its product id (the only field needed after matching)
+    product_ids_by_sku = dict(iter_sku_keys(products_response.data))
 
     print(f"Loaded {len(products_response.data)} products from database")
     print(f"CSV file: {csv_path}")
@@ -145,72 +186,60 @@ def main():
     print(f"Found {len(items)} items with qty > 0 in CSV")
     print()
 
-    reconciled = 0
     skipped = []
     errors = []
+    # One {"product_id", "quantity"} entry per matched CSV row
+    rpc_items = []
+    skus_by_product = {}
+    # Per-row progress, written in one go after the loop
+    log_lines = []
 
     for item in items:
         sku = item["sku"]
-        name = item["name"]
         quantity = item["quantity"]
-        row = item["row"]
 
         if not sku:
-            skipped.append((row, sku, name, quantity, "Missing SKU"))
+            skipped.append((item["row"], sku, item["name"], quantity, "Missing SKU"))
             continue
 
         # Try to match product by SKU variations
-        product = None
-        for variation in create_sku_variations(sku):
-            if variation in products_by_sku:
-                product = products_by_sku[variation]
-                break
-
-        if not product:
-            skipped.append((row, sku, name, quantity, "Product not found"))
+        product_id = find_product_id(sku, product_ids_by_sku)
+
+        if not product_id:
+            skipped.append((item["row"], sku, item["name"], quantity, "Product not found"))
             continue
 
-        try:
-            # Get or create inventory item
-            inventory = supabase.table("inventory_items")\
-                .select("*")\
-                .eq("warehouse_id", MAIN_WAREHOUSE_ID)\
-                .eq("product_id", product["id"])\
-                .execute()
-
-            if inventory.data and len(inventory.data) > 0:
-                # Update existing inventory - ADD to current quantity
-                current_qty = inventory.data[0]["quantity_on_hand"]
-                new_qty = current_qty + quantity
-                supabase.table("inventory_items")\
-                    .update({"quantity_on_hand": new_qty})\
-                    .eq("id", inventory.data[0]["id"])\
-                    .execute()
-                print(f"  + {sku}: {current_qty} + {quantity} = {new_qty}")
-            else:
-                # Create new inventory item
-                new_qty = quantity
-                supabase.table("inventory_items").insert({
-                    "warehouse_id": MAIN_WAREHOUSE_ID,
-                    "product_id": product["id"],
-                    "quantity_on_hand": new_qty,
-                }).execute()
-                print(f"  + {sku}: 0 + {quantity} = {new_qty} (new item)")
-
-            # Create ADJUSTMENT transaction
-            supabase.table("transactions").insert({
-                "transaction_type": "ADJUSTMENT",
-                "product_id": product["id"],
-                "from_warehouse_id": None,
-                "to_warehouse_id": MAIN_WAREHOUSE_ID,
-                "quantity": quantity,
-                "reference_note": reference_note,
-            }).execute()
+        rpc_items.append({"product_id": product_id, "quantity": quantity})
+        skus_by_product.setdefault(product_id, sku)
+        log_lines.append(f"  + {sku}: +{quantity}")
 
-            reconciled += 1
+    if log_lines:
+        print("\n".join(log_lines))
 
+    # Record every ADJUSTMENT and add the stock in one transaction
+    # (reconcile_inventory, migration 028); a failure rolls back the whole run
+    reconciled = 0
+    stock_levels = {}
+    if rpc_items:
+        try:
+            result = supabase.rpc("reconcile_inventory", {
+                "p_warehouse_id": MAIN_WAREHOUSE_ID,
+                "p_items": rpc_items,
+                "p_reference_note": reference_note,
+            }).execute()
         except Exception as e:
-            errors.append(f"Row {row}: Failed to reconcile {sku}: {str(e)}")
+            errors.append(f"Failed to reconcile {len(rpc_items)} items, nothing was saved: {str(e)}")
+        else:
+            reconciled = len(rpc_items)
+            stock_levels = {r["product_id"]: r["quantity_on_hand"] for r in result.data}
+
+    if stock_levels:
+        print()
+        print("NEW STOCK LEVELS:")
+        print("\n".join(
+            f"  = {skus_by_product[product_id]}: {qty}"
+            for product_id, qty in stock_levels.items()
+        ))
 
     # Print summary
     print()
@@ -226,7 +255,7 @@ def main():
         print("SKIPPED ITEMS:")
         print("-" * 50)
         for row, sku, name, qty, reason in skipped:
-            print(f"  Row {row}: [{sku or 'NO SKU'}] {name} (qty: {qty}) - {reason}")
+            print(f"  Row {row}: [{sku or 'NO SKU'}] {name.strip()} (qty: {qty}) - {reason}")
 
     if errors:
         print()